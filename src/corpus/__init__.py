@@ -1,2 +1,2 @@
-from summarization.utils import Sentence
-from .corpus import Corpus
\ No newline at end of file
+from summarization.utils import Sentence, SentenceRecord, SentenceStore, load_pipeline, DEFAULT_PIPELINE
+from .corpus import Corpus
@@ -0,0 +1,69 @@
+
+from collections import namedtuple
+from itertools import tee
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from spacy.language import Language
+
+from . import SentenceRecord, load_pipeline
+from .readers import RawStory
+
+# The annotated contents of a single story. Sentences are `SentenceRecord`s in document order.
+AnnotatedStory = namedtuple("AnnotatedStory", ("doc_id", "timestamp", "headline", "sentences"))
+
+
+DEFAULT_BATCH_SIZE = 64
+
+
+def body_text(raw_story: RawStory) -> str:
+    """Joins the paragraphs of a story into a single string with normalized whitespace."""
+    raw_body = []  # less elegant than a list comprehension, but with a comp we'd have to flatten a nest later
+    for text in raw_story.paragraphs:
+        if text:
+            text = ' '.join(text.strip().split())  # this split and join is to get rid of all the weird kinds of whitespace characters from the xml parse
+            raw_body.append(text)
+    return ' '.join(raw_body)
+
+
+def annotate_stories(nlp: Language, raw_stories: Iterable[RawStory],
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[AnnotatedStory]:
+    """Given the raw contents of documents, splits their body text into annotated sentences. Bodies are
+    sent through the pipeline in batches.
+
+    :param nlp: a SpaCy language object which can split sentences
+    :param raw_stories: the raw headline, timestamp and body text of Aquaint, Aquaint 2 or Gigaword documents
+    :param batch_size: the number of documents SpaCy annotates at a time
+    :return: an iterator of annotated stories, in the same order
+    """
+    raw_stories, raw_stories_to_parse = tee(raw_stories)
+    docs = nlp.pipe((body_text(raw_story) for raw_story in raw_stories_to_parse), batch_size=batch_size)
+    for raw_story, doc in zip(raw_stories, docs):
+        sentences = [SentenceRecord.from_span(sent) for sent in doc.sents]
+        yield AnnotatedStory(raw_story.doc_id, raw_story.timestamp, raw_story.headline, sentences)
+
+
+def read_tasks(tasks: Iterable[Tuple[Callable[[str, Iterable[str]], Iterator[RawStory]], str, Iterable[str]]]) \
+        -> Iterator[RawStory]:
+    """Reads the requested documents of corpus files.
+
+    :param tasks: (reader, path, doc ids) tuples, where reader streams the raw stories out of the file at path
+    :return: an iterator of the raw stories which were found, file by file
+    """
+    for reader, path, doc_ids in tasks:
+        yield from reader(path, doc_ids)
+
+
+# The SpaCy pipeline and batch size of a worker process, set once by `init_worker`.
+_worker_nlp = None
+_worker_batch_size = DEFAULT_BATCH_SIZE
+
+
+def init_worker(pipeline_name: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    global _worker_nlp, _worker_batch_size
+    _worker_nlp = load_pipeline(pipeline_name)
+    _worker_batch_size = batch_size
+
+
+def annotate_task_in_worker(task) -> List[AnnotatedStory]:
+    """Reads and annotates the documents of a single (reader, path, doc ids) task with the worker's own pipeline."""
+    return list(annotate_stories(_worker_nlp, read_tasks([task]), _worker_batch_size))
@@ -0,0 +1,101 @@
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import spacy
+from spacy.language import Language
+
+from . import SentenceRecord
+from .annotation import AnnotatedStory
+
+
+class AnnotationCache(object):
+    """A persistent, on-disk cache of annotated stories.
+
+    Each story is stored as a json file holding its headline, timestamp, sentences, tokens and word counts,
+    plus a `.npy` file of its sentence vectors which is memory-mapped when it is loaded. Entries are keyed by
+    the document id, a fingerprint of the file the document was read from and the SpaCy pipeline, so a
+    changed source file or model is never served stale annotations.
+    """
+
+    # Bump this whenever the way stories are annotated changes.
+    VERSION = 1
+
+    TIMESTAMP_FORMAT = "%Y-%m-%d"
+
+    def __init__(self, cache_path: str, nlp: Language, pipeline_name: str):
+        """
+        :param cache_path: the directory in which to store the cache
+        :param nlp: the SpaCy language object the stories are annotated with
+        :param pipeline_name: the name `nlp` was loaded by
+        """
+        self.cache_path = cache_path
+        self.pipeline_id = "{0}:{1}:spacy-{2}:v{3}".format(pipeline_name, nlp.meta.get("version"),
+                                                          spacy.__version__, AnnotationCache.VERSION)
+        self.__fingerprints = dict()
+
+    def fingerprint(self, source_file: str) -> str:
+        """Fingerprints a source file by its size and modification time."""
+        if source_file not in self.__fingerprints:
+            stat = os.stat(source_file)
+            self.__fingerprints[source_file] = "{0}:{1}".format(stat.st_size, stat.st_mtime_ns)
+        return self.__fingerprints[source_file]
+
+    def __entry_path(self, doc_id: str, source_file: str) -> str:
+        key = "|".join((doc_id, self.fingerprint(source_file), self.pipeline_id))
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_path, digest[:2], digest)
+
+    def get(self, doc_id: str, source_file: str):
+        """Gets a cached story.
+
+        :param doc_id: the id of the document
+        :param source_file: the file the document is read from
+        :return: the `AnnotatedStory`, or None if it isn't cached
+        """
+        try:
+            entry_path = self.__entry_path(doc_id, source_file)
+            with open(entry_path + ".json") as infile:
+                entry = json.load(infile)
+            vectors = np.load(entry_path + ".npy", mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        timestamp = entry["timestamp"]
+        if timestamp is not None:
+            timestamp = datetime.strptime(timestamp, AnnotationCache.TIMESTAMP_FORMAT)
+        sentences = [SentenceRecord(text, tuple(tokens), vector, word_count) for text, tokens, vector, word_count
+                     in zip(entry["sentences"], entry["tokens"], vectors, entry["word_counts"])]
+        return AnnotatedStory(doc_id, timestamp, entry["headline"], sentences)
+
+    def put(self, story: AnnotatedStory, source_file: str):
+        """Stores an annotated story.
+
+        :param story: the story to store
+        :param source_file: the file the document was read from
+        """
+        entry_path = self.__entry_path(story.doc_id, source_file)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        entry = {
+            "doc_id": story.doc_id,
+            "timestamp": story.timestamp.strftime(AnnotationCache.TIMESTAMP_FORMAT) if story.timestamp else None,
+            "headline": story.headline,
+            "sentences": [sentence.text for sentence in story.sentences],
+            "tokens": [sentence.tokens for sentence in story.sentences],
+            "word_counts": [sentence.word_count for sentence in story.sentences],
+        }
+        width = len(story.sentences[0].vector) if story.sentences else 0
+        vectors = np.array([sentence.vector for sentence in story.sentences], dtype=np.float32) \
+            .reshape(len(story.sentences), width)
+
+        # Write the vectors first and the json last, so that an entry is only visible once it is complete.
+        with open(entry_path + ".npy.tmp", "wb") as outfile:
+            np.save(outfile, vectors)
+        os.replace(entry_path + ".npy.tmp", entry_path + ".npy")
+        with open(entry_path + ".json.tmp", "w") as outfile:
+            json.dump(entry, outfile)
+        os.replace(entry_path + ".json.tmp", entry_path + ".json")
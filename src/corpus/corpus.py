@@ -1,154 +1,205 @@
 
 import os
-import gzip
 import logging
-import itertools
-from datetime import datetime
-from typing import Dict, List
+from collections import defaultdict
+from multiprocessing import Pool
+from typing import Dict, Iterable, List
 
 import lxml.etree as ET
-from lxml import html
-from bs4 import BeautifulSoup
 from spacy.language import Language
 
-from . import Sentence
+from . import SentenceStore, DEFAULT_PIPELINE
+from .annotation import DEFAULT_BATCH_SIZE, annotate_stories, annotate_task_in_worker, init_worker, read_tasks
+from .annotation_cache import AnnotationCache
 from .corpus_document import CorpusDocument
 from .docset import Docset
+from .gigaword import GigawordIndex
+from .readers import read_aquaint_stories, read_aquaint2_stories
 from .story import Story
 from .topic import Topic
 
 
 class Corpus(object):
     """Stores information about the corpus, including topic descriptions and docsets."""
-    def __init__(self, topics, base_paths, nlp):
+
+    AQUAINT_KEY = "aquaint"
+    AQUAINT2_KEY = "aquaint2"
+    GIGAWORD_KEY = "gw"
+    DEFAULT_GW_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ling573", "gw_index")
+
+    def __init__(self, topics, base_paths, nlp, gw_index_path=DEFAULT_GW_INDEX_PATH, workers=1,
+                 pipeline_name=DEFAULT_PIPELINE, batch_size=DEFAULT_BATCH_SIZE, annotation_cache_path=None,
+                 streaming=False, update=False):
+        """
+        :param topics: the topics of the corpus, in order
+        :param base_paths: a map from collection name to the directory it lives in
+        :param nlp: a SpaCy language object which can split sentences
+        :param gw_index_path: the directory in which the Gigaword index is built
+        :param workers: the number of processes with which to preprocess the corpus
+        :param pipeline_name: the SpaCy pipeline each worker process loads; it should match `nlp`
+        :param batch_size: the number of documents SpaCy annotates at a time
+        :param annotation_cache_path: an optional directory in which to cache annotated stories across runs
+        :param streaming: if set, topics are only preprocessed as `iter_topics` reaches them, rather than up front
+        :param update: if set, the update docsets (docsetB) of the topics are read too, into `Topic.update_stories`
+        """
         self.topics = topics
         self.base_paths = base_paths
         self.nlp = nlp
+        self.workers = workers
+        self.pipeline_name = pipeline_name
+        self.batch_size = batch_size
+        self.annotation_cache = AnnotationCache(annotation_cache_path, nlp, pipeline_name) \
+            if annotation_cache_path else None
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
-        self.preprocess_topic_docs()
+        self.gw_index = GigawordIndex(base_paths.get(Corpus.GIGAWORD_KEY), gw_index_path) \
+            if base_paths.get(Corpus.GIGAWORD_KEY) else None
+        self.streaming = streaming
+        self.update = update
+        self.__pool = None
+        if not streaming:
+            self.preprocess_topic_docs()
+            self.close()
 
     @classmethod
-    def from_config(cls, conf: Dict, nlp: Language):
+    def from_config(cls, conf: Dict, nlp: Language, workers: int = None, streaming: bool = None, update: bool = None):
         """Given a yaml config file and a , this will read
         information about the corpus and return a Corpus object.
 
         :param yaml_file: filesystem configuration information (e.g., where the data live, etc.)
         :param nlp: a SpaCy language object
+        :param workers: the number of preprocessing processes, overriding the config's 'workers'
+        :param streaming: whether to preprocess topics lazily, overriding the config's 'streaming'
+        :param update: whether to read the topics' update docsets, overriding the config's 'updateSummaries'
         :return: A Corpus object
         """
         xml_path = conf.get('clusterPath')
         document_collections = conf.get('documentCollections')
+        gw_index_path = conf.get('gwIndexPath') or Corpus.DEFAULT_GW_INDEX_PATH
+        workers = int(workers or conf.get('workers') or 1)
+        pipeline_name = conf.get('spacyModel') or DEFAULT_PIPELINE
+        batch_size = int(conf.get('nlpBatchSize') or DEFAULT_BATCH_SIZE)
+        annotation_cache_path = conf.get('annotationCachePath')
+        streaming = bool(streaming or conf.get('streaming'))
+        update = bool(update or conf.get('updateSummaries'))
         if not xml_path:
             raise ValueError("Config is missing 'clusterPath'")
         if not document_collections:
             raise ValueError("Config is missing 'documentCollections'")
 
         xml_root = ET.parse(xml_path)
-        topics = set()
+        topics = []
         for topic in xml_root.findall("topic"):
             topic_id = topic.get("id")
             topic_title = topic.find("title").text.strip()
             topic_narrative = topic.find("narrative")
             if topic_narrative is not None:
                 topic_narrative = topic_narrative.text.strip()
-            docsetA_element = topic.find("docsetA")
-            docsetA = set()
-            docset_id = docsetA_element.get("id")
-            for doc in docsetA_element:
-                docsetA.add(CorpusDocument(doc.get("id")))
-            docset = Docset(docset_id, docsetA)
-            topics.add(Topic(topic_id, topic_title, topic_narrative, docset))
-        return cls(topics, document_collections, nlp)
+            docset = cls.__read_docset(topic.find("docsetA"))
+            update_docset = cls.__read_docset(topic.find("docsetB"))
+            topics.append(Topic(topic_id, topic_title, topic_narrative, docset, update_docset))
+        return cls(topics, document_collections, nlp, gw_index_path, workers, pipeline_name, batch_size,
+                   annotation_cache_path, streaming, update)
+
+    @staticmethod
+    def __read_docset(docset_element):
+        """Reads a docset element of the topic file, or returns None if there isn't one."""
+        if docset_element is None:
+            return None
+        return Docset(docset_element.get("id"), [CorpusDocument(doc.get("id")) for doc in docset_element])
+
 
+    def __source_of(self, doc: CorpusDocument) -> str:
+        """Routes a document to the collection it lives in, without opening any files.
 
-    def __process_document(self, doc: CorpusDocument):
-        """Given a document, parses information from the document to create a story.
+        Aquaint ids are recognizable from their form. Aquaint 2 and Gigaword ids share a form, so a
+        document is looked for in Gigaword only when Aquaint 2 has no file for its month.
 
-        :param doc: a Aquaint or Aquaint 2 document from the corpus
-        :return: the story in the document
+        :param doc: a corpus document
+        :return: the `documentCollections` key of the document's collection
         """
-        curr_doc, doc_timestamp, headline_text, text_iterator = \
-            self.__process_aquaint2_document(doc) if doc.is_aquaint2 \
-                else self.__process_aquaint_document(doc)
-
-        headline = curr_doc.find(headline_text)
-        if headline is not None:
-            headline = headline.text.strip()  # CURRENTLY NOT PREPROCESSING HEADLINE
-        raw_body = []  # less elegant than a list comprehension, but with a comp we'd have to flatten a nest later
-        for text in text_iterator:
-            if text:
-                text = ' '.join(text.strip().split())  # this split and join is to get rid of all the weird kinds of whitespace characters from the xml parse
-                raw_body.append(text)
-        raw_body = ' '.join(raw_body)
-        sents = { Sentence(doc.id(), doc_timestamp, sent, i) for i, sent in enumerate(self.nlp(raw_body).sents) }
-        return Story(headline, sents)
-
-    def __process_gw_document(self, doc: CorpusDocument):
-        parser = ET.XMLParser(recover=True)
-        path = os.path.join(self.base_paths.get("gw"), doc.get_path().replace(".xml", ".gz"))
-        with gzip.open(path, 'rt') as f:
-            fragments = html.fragments_fromstring(f.read(), parser=parser)
-            print("Trying to find '{0}' in '{1}'".format(doc.id(), path))
-            curr_doc = None
-            for frag in fragments:
-                try:
-                   _id = frag.get("id")
-                   if doc.id() == _id: 
-                       curr_doc = frag
-                except AttributeError:
-                    print(ET.tostring(frag))
-            if curr_doc is None: 
-                raise ValueError("Doc '{0}' not found in '{1}'".format(doc.id(), path))
-            print("Current doc is {0}".format(curr_doc))
-            doc_timestamp = None
-            headline_text = "HEADLINE"
-            text_iterator = curr_doc.find("TEXT").itertext()
-            return curr_doc, doc_timestamp, headline_text, text_iterator
-
-    def __process_aquaint2_document(self, doc: CorpusDocument):
-        """The specific processing function for an aquaint 2 document.
-
-        :param doc: an aquaint 2 corpus document
-        :return: a tuple containing the XML document object, the timestamp
-        of the document, the headline text, and an iterator of all the text
-        in the document.
+        if doc.is_aquaint:
+            return Corpus.AQUAINT_KEY
+        aquaint2_path = self.base_paths.get(Corpus.AQUAINT2_KEY)
+        if aquaint2_path and os.path.isfile(os.path.join(aquaint2_path, doc.get_path())):
+            return Corpus.AQUAINT2_KEY
+        return Corpus.GIGAWORD_KEY
+
+    def __read_tasks(self, docs: Iterable[CorpusDocument]):
+        """Groups the requested documents by the file they live in so that each file is read only once,
+        however many topics draw from it.
+
+        :param docs: the documents to read
+        :return: a list of (source file, (reader, path, doc ids)) tuples, one per file
         """
+        docs_by_path = defaultdict(set)
+        for doc in docs:
+            docs_by_path[(self.__source_of(doc), doc.get_path())].add(doc.id())
 
-        # Create an artificial root
-        try:
-            parser = ET.XMLParser(recover=True)
-            xml_root = ET.parse(os.path.join(self.base_paths.get("aquaint2"), doc.get_path()), parser=parser)
-            curr_doc = xml_root.find('.//DOC[@id="{0}"]'.format(doc.id()))  # find (vs findall): should only be one
-            doc_timestamp = None
-            headline_text = "HEADLINE"
-            text_iterator = curr_doc.find("TEXT").itertext()
-            return curr_doc, doc_timestamp, headline_text, text_iterator
-        except:
-            return self.__process_gw_document(doc)
-
-    def __process_aquaint_document(self, doc: CorpusDocument):
-        """The specific processing function for an aquaint document.
-
-        :param doc: an aquaint corpus document
-        :return: a tuple containing the XML document object, the timestamp
-        of the document, the headline text, and an iterator of all the text
-        in the document.
+        tasks = []
+        for (source, path), doc_ids in sorted(docs_by_path.items()):
+            if source in (Corpus.AQUAINT_KEY, Corpus.AQUAINT2_KEY) and \
+                    not os.path.isfile(os.path.join(self.base_paths.get(source), path)):
+                # the documents are reported as missing once everything has been read
+                continue
+            if source == Corpus.AQUAINT_KEY:
+                source_file = os.path.join(self.base_paths.get(source), path)
+                tasks.append((source_file, (read_aquaint_stories, source_file, sorted(doc_ids))))
+            elif source == Corpus.AQUAINT2_KEY:
+                source_file = os.path.join(self.base_paths.get(source), path)
+                tasks.append((source_file, (read_aquaint2_stories, source_file, sorted(doc_ids))))
+            elif self.gw_index is not None:
+                path = path.replace(".xml", ".gz")
+                source_file = os.path.join(self.gw_index.gw_path, path)
+                tasks.append((source_file, (self.gw_index.read_stories, path, sorted(doc_ids))))
+        return tasks
+
+    def __annotate(self, docs: Iterable[CorpusDocument]):
+        """Reads and annotates the requested documents, sharding the files over `self.workers` processes.
+        Documents in the annotation cache are loaded from it instead, and new annotations are added to it.
+
+        :param docs: the documents to annotate
+        :return: a map from document id to annotated story
         """
-        with open(os.path.join(self.base_paths.get("aquaint"), doc.get_path()), "r") as infile:
-            xml_root = BeautifulSoup(infile, "lxml")
-        curr_doc = xml_root.find("docno", text=" {} ".format(doc.id())).parent
-        time = curr_doc.find("date_time")
-        if time is None:
-            doc_timestamp = None
+        annotated_stories = dict()
+        tasks = []
+        source_files = dict()
+        for source_file, (reader, path, doc_ids) in self.__read_tasks(docs):
+            if self.annotation_cache is not None:
+                for doc_id in doc_ids:
+                    cached = self.annotation_cache.get(doc_id, source_file)
+                    if cached is not None:
+                        annotated_stories[doc_id] = cached
+                doc_ids = [doc_id for doc_id in doc_ids if doc_id not in annotated_stories]
+            if doc_ids:
+                tasks.append((reader, path, doc_ids))
+                source_files.update((doc_id, source_file) for doc_id in doc_ids)
+
+        new_stories = self.__annotate_tasks(tasks)
+        if self.annotation_cache is not None:
+            print("Loaded {0} cached Docs, annotated {1}".format(len(annotated_stories), len(new_stories)))
+            for doc_id, story in new_stories.items():
+                self.annotation_cache.put(story, source_files[doc_id])
+        annotated_stories.update(new_stories)
+        return annotated_stories
+
+    def __annotate_tasks(self, tasks):
+        """Reads and annotates the documents of (reader, path, doc ids) tasks, sharding them over `self.workers` processes.
+
+        :param tasks: the tasks to run
+        :return: a map from document id to annotated story
+        """
+        annotated_stories = dict()
+        if self.workers > 1 and len(tasks) > 1:
+            # The pool is kept between calls so that workers load their pipeline only once per run
+            if self.__pool is None:
+                self.__pool = Pool(self.workers, initializer=init_worker, initargs=(self.pipeline_name, self.batch_size))
+            for file_stories in self.__pool.imap_unordered(annotate_task_in_worker, tasks):
+                annotated_stories.update((story.doc_id, story) for story in file_stories)
         else:
-            date = time.text.strip().split()[0]
-            # Accounts for multiple date formats.
-            format = "%Y-%m-%d" if '-' in date else "%m/%d/%Y"
-            doc_timestamp = datetime.strptime(date, format)
-        headline_text = "headline"
-        text_iterator = [tag.text for tag in curr_doc.find_all("text")]
-        return curr_doc, doc_timestamp, headline_text, text_iterator
+            for story in annotate_stories(self.nlp, read_tasks(tasks), self.batch_size):
+                annotated_stories[story.doc_id] = story
+        return annotated_stories
 
     def preprocess_topic_docs(self, topic_ids: List[str] = None):
         """Process newswire style xml into text and Story objects
@@ -169,9 +220,68 @@ class Corpus(object):
             all_topics = self.topics
 
         print("Processing {0} Topics in Corpus".format(len(all_topics)))
+        annotated_stories = self.__annotate(doc for topic in all_topics for doc in self.__docs(topic))
         for topic in all_topics:
             print("Processing {0} Docs in Topic".format(len(topic.docset)))
-            for doc in topic.docset:
-                story = self.__process_document(doc)
-                topic.add_story(story)
+            topic_stories = self.__annotated_docset(topic.docset, annotated_stories)
+            update_stories = self.__annotated_docset(topic.update_docset, annotated_stories) if self.update else []
+
+            # Every sentence of the topic (including its update docset) lives in a single columnar store;
+            # stories hold views of its rows
+            store = SentenceStore.build((story.doc_id, story.timestamp, i, sent)
+                                        for story in topic_stories + update_stories
+                                        for i, sent in enumerate(story.sentences))
+            sentences = store.sentences()
+            topic.sentence_store = store
+            start = 0
+            for i, annotated in enumerate(topic_stories + update_stories):
+                end = start + len(annotated.sentences)
+                story = Story(annotated.headline, sentences[start:end])  # CURRENTLY NOT PREPROCESSING HEADLINE
+                if i < len(topic_stories):
+                    topic.add_story(story)
+                else:
+                    topic.add_update_story(story)
+                start = end
+
+    def __docs(self, topic: Topic) -> List[CorpusDocument]:
+        """The documents of a topic to read: its docset, plus its update docset in update mode."""
+        if self.update and topic.update_docset is not None:
+            return list(topic.docset) + list(topic.update_docset)
+        return list(topic.docset)
+
+    def __annotated_docset(self, docset: Docset, annotated_stories):
+        """Gets the annotated stories of a docset in docset order, skipping (and warning about) missing documents."""
+        stories = []
+        for doc in docset or []:
+            annotated = annotated_stories.get(doc.id())
+            if annotated is None:
+                self.logger.warning("Doc '{0}' not found in '{1}', skipping it".format(doc.id(), doc.get_path()))
+                continue
+            stories.append(annotated)
+        return stories
+
+    def iter_topics(self):
+        """Yields the topics of the corpus one at a time.
+
+        When streaming, each topic is preprocessed only once it is requested, and its stories are freed as
+        soon as the caller asks for the next topic. Peak memory then depends on the largest topic rather
+        than on the whole corpus.
+
+        :return: an iterator of topics, in order
+        """
+        try:
+            for topic in self.topics:
+                if self.streaming:
+                    self.preprocess_topic_docs([topic.id()])
+                yield topic
+                if self.streaming:
+                    topic.clear_stories()
+        finally:
+            self.close()
 
+    def close(self):
+        """Shuts down the preprocessing worker processes, if there are any."""
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
@@ -0,0 +1,117 @@
+
+import argparse
+import gzip
+import os
+import re
+from typing import Dict, Iterable, Iterator, Tuple
+
+import lxml.etree as ET
+
+from .readers import RawStory, story_from_element
+
+DOC_ID_PATTERN = re.compile(rb'<DOC\s+id="([^"]+)"')
+
+
+class GigawordIndex(object):
+    """A random-access index over English Gigaword `.gz` files.
+
+    A Gigaword file is a single gzip stream, so finding one story in it means inflating the whole file.
+    The first time a file is needed, it is re-written into the index directory as a chunked gzip in which
+    every DOC is its own gzip member, along with a table of the offset and length of each member. Reading
+    a story is then one seek plus one small decompress.
+    """
+
+    INDEX_SUFFIX = ".idx"
+
+    def __init__(self, gw_path: str, index_path: str):
+        """
+        :param gw_path: the root of the Gigaword collection
+        :param index_path: a writable directory in which to store the chunked files and their indexes
+        """
+        self.gw_path = gw_path
+        self.index_path = index_path
+        self.__offsets = dict()
+
+    def chunked_path(self, path: str) -> str:
+        return os.path.join(self.index_path, path)
+
+    def index_file(self, path: str) -> str:
+        return self.chunked_path(path) + GigawordIndex.INDEX_SUFFIX
+
+    def build(self, path: str):
+        """Builds the chunked copy and the offset index of a single Gigaword file.
+
+        :param path: the path of the `.gz` file, relative to the Gigaword collection
+        """
+        chunked_path, index_file = self.chunked_path(path), self.index_file(path)
+        os.makedirs(os.path.dirname(chunked_path), exist_ok=True)
+
+        # Write to temporary files first so that an interrupted build never leaves a partial index behind.
+        offset = 0
+        with gzip.open(os.path.join(self.gw_path, path), "rb") as infile, \
+                open(chunked_path + ".tmp", "wb") as chunked, open(index_file + ".tmp", "w") as index:
+            for doc_id, doc in self.__split_docs(infile):
+                member = gzip.compress(doc, compresslevel=6)
+                chunked.write(member)
+                index.write("{0}\t{1}\t{2}\n".format(doc_id, offset, len(member)))
+                offset += len(member)
+        os.replace(chunked_path + ".tmp", chunked_path)
+        os.replace(index_file + ".tmp", index_file)
+
+    @staticmethod
+    def __split_docs(lines: Iterable[bytes]) -> Iterator[Tuple[str, bytes]]:
+        doc_id, doc = None, []
+        for line in lines:
+            match = DOC_ID_PATTERN.match(line)
+            if match:
+                doc_id, doc = match.group(1).decode(), []
+            if doc_id is None:
+                continue
+            doc.append(line)
+            if line.startswith(b"</DOC>"):
+                yield doc_id, b"".join(doc)
+                doc_id = None
+
+    def offsets(self, path: str) -> Dict[str, Tuple[int, int]]:
+        """Gets the (offset, length) of every document in a Gigaword file, indexing the file if needed."""
+        if path not in self.__offsets:
+            if not os.path.isfile(self.index_file(path)):
+                self.build(path)
+            offsets = dict()
+            with open(self.index_file(path)) as index:
+                for line in index:
+                    doc_id, offset, length = line.split("\t")
+                    offsets[doc_id] = (int(offset), int(length))
+            self.__offsets[path] = offsets
+        return self.__offsets[path]
+
+    def read_stories(self, path: str, doc_ids: Iterable[str]) -> Iterator[RawStory]:
+        """Reads the requested documents of a Gigaword file. Documents that aren't in the file are skipped.
+
+        :param path: the path of the `.gz` file, relative to the Gigaword collection
+        :param doc_ids: the ids of the documents to read
+        :return: an iterator of `RawStory` objects, in file order
+        """
+        offsets = self.offsets(path)
+        found = sorted((offsets[doc_id], doc_id) for doc_id in doc_ids if doc_id in offsets)
+        parser = ET.XMLParser(recover=True)
+        with open(self.chunked_path(path), "rb") as chunked:
+            for (offset, length), doc_id in found:
+                chunked.seek(offset)
+                doc = ET.fromstring(gzip.decompress(chunked.read(length)), parser=parser)
+                yield story_from_element(doc_id, doc)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Builds the random-access index of every Gigaword file ahead of time.")
+    p.add_argument('gw_path', help='the root of the Gigaword collection')
+    p.add_argument('index_path', help='the directory to write the chunked files and indexes to')
+    args = p.parse_args()
+
+    gw_index = GigawordIndex(args.gw_path, args.index_path)
+    for root, _, files in os.walk(args.gw_path):
+        for name in sorted(files):
+            if name.endswith(".gz"):
+                path = os.path.relpath(os.path.join(root, name), args.gw_path)
+                print("Indexing {0}".format(path))
+                gw_index.build(path)
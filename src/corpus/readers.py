@@ -0,0 +1,86 @@
+
+from collections import namedtuple
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import lxml.etree as ET
+
+# The raw, unannotated contents of a single story as read from a corpus file.
+RawStory = namedtuple("RawStory", ("doc_id", "timestamp", "headline", "paragraphs"))
+
+
+def _release(element):
+    """Frees an element (and everything parsed before it) once it has been consumed so that
+    streaming a file keeps memory flat."""
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
+
+
+def _timestamp(date_time: str):
+    if date_time is None:
+        return None
+    date = date_time.strip().split()[0]
+    # Accounts for multiple date formats.
+    format = "%Y-%m-%d" if '-' in date else "%m/%d/%Y"
+    return datetime.strptime(date, format)
+
+
+def _headline(element, tag: str):
+    headline = element.find(tag)
+    if headline is None:
+        return None
+    return ''.join(headline.itertext()).strip()
+
+
+def story_from_element(doc_id: str, element, timestamp=None) -> RawStory:
+    """Pulls the headline and body text out of an AQUAINT-2 or Gigaword style DOC element."""
+    text = element.find("TEXT")
+    paragraphs = list(text.itertext()) if text is not None else []
+    return RawStory(doc_id, timestamp, _headline(element, "HEADLINE"), paragraphs)
+
+
+def read_aquaint2_stories(path: str, doc_ids: Optional[Iterable[str]] = None) -> Iterator[RawStory]:
+    """Streams an AQUAINT-2 file once, yielding a story for each of the requested document ids.
+
+    Parsing stops as soon as every requested document has been found.
+
+    :param path: the path to a monthly AQUAINT-2 xml file
+    :param doc_ids: the ids of the DOC elements to extract, or None for every document of the file
+    :return: an iterator of `RawStory` objects, in file order
+    """
+    wanted = None if doc_ids is None else set(doc_ids)
+    with open(path, "rb") as infile:
+        for _, element in ET.iterparse(infile, events=("end",), tag="DOC", recover=True):
+            doc_id = element.get("id")
+            if wanted is None or doc_id in wanted:
+                if wanted is not None:
+                    wanted.remove(doc_id)
+                yield story_from_element(doc_id, element)
+            _release(element)
+            if wanted is not None and not wanted:
+                break
+
+
+def read_aquaint_stories(path: str, doc_ids: Optional[Iterable[str]] = None) -> Iterator[RawStory]:
+    """Streams a daily AQUAINT file once, yielding a story for each of the requested document ids.
+
+    AQUAINT files are SGML without a root element, so they are read with the (forgiving) HTML parser,
+    which lower-cases tag names. Parsing stops as soon as every requested document has been found.
+
+    :param path: the path to a daily AQUAINT file
+    :param doc_ids: the ids of the DOCNO elements to extract, or None for every document of the file
+    :return: an iterator of `RawStory` objects, in file order
+    """
+    wanted = None if doc_ids is None else set(doc_ids)
+    with open(path, "rb") as infile:
+        for _, element in ET.iterparse(infile, events=("end",), tag="doc", html=True):
+            doc_id = (element.findtext("docno") or "").strip()
+            if wanted is None or doc_id in wanted:
+                if wanted is not None:
+                    wanted.remove(doc_id)
+                paragraphs = [''.join(text.itertext()) for text in element.iter("text")]
+                yield RawStory(doc_id, _timestamp(element.findtext("date_time")), _headline(element, "headline"), paragraphs)
+            _release(element)
+            if wanted is not None and not wanted:
+                break
@@ -1,17 +1,28 @@
-
 class Topic(object):
-    def __init__(self, _id, title, narrative, docset):
+    def __init__(self, _id, title, narrative, docset, update_docset=None):
         self._id = _id
         self.title = title
         self.narrative = narrative
         self.docset = docset
-        self.stories = set()
+        # docsetB of update summarization topics, which is only read when the corpus is in update mode
+        self.update_docset = update_docset
+        self.stories = []
+        self.update_stories = []
+        self.sentence_store = None
 
     def id(self):
         return self._id
 
     def add_story(self, story):
-        self.stories.add(story)
+        self.stories.append(story)
 
     def add_stories(self, stories):
-        self.stories.update(stories)
+        self.stories.extend(stories)
+
+    def add_update_story(self, story):
+        self.update_stories.append(story)
+
+    def clear_stories(self):
+        self.stories = []
+        self.update_stories = []
+        self.sentence_store = None
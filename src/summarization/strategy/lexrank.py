@@ -10,15 +10,50 @@ from collections import namedtuple
 from operator import attrgetter
 
 import numpy as np
+from scipy.sparse import csr_matrix, hstack, issparse, vstack
 
 from . import Document, Embedder
 
 from typing import Iterable
 
-from itertools import product
-
 SentenceInfo = namedtuple("SentenceInfo", ("sentence", "order", "rating",))
 
+
+class TopKStable(object):
+    """A stopping rule for `LexRankSummarizer.power_method` which ends the iterations once the best sentences that
+    fit in the word limit have been ranked in the same order for `patience` iterations in a row, even if the scores
+    of the rest of the sentences are still changing.
+    """
+
+    DEFAULT_PATIENCE = 3
+
+    def __init__(self, word_counts, word_limit: int, patience: int = DEFAULT_PATIENCE):
+        """
+        :param word_counts: the word count of each sentence
+        :param word_limit: the word limit of the summary
+        :param patience: the number of iterations the top sentences must stay the same for
+        """
+        self.word_counts = np.asarray(word_counts)
+        self.word_limit = word_limit
+        self.patience = patience
+
+        self.__top = None
+        self.__stable_iterations = 0
+
+    def __call__(self, p_vector) -> bool:
+        order = np.argsort(-p_vector, kind="stable")
+        # keep every sentence up to (and including) the first which would take the summary over the word limit
+        k = np.searchsorted(np.cumsum(self.word_counts[order]), self.word_limit, side="right") + 1
+        top = order[:k]
+
+        if self.__top is not None and np.array_equal(top, self.__top):
+            self.__stable_iterations += 1
+        else:
+            self.__stable_iterations = 0
+        self.__top = top
+
+        return self.__stable_iterations >= self.patience
+
 class AbstractSummarizer(object):
     def __init__(self, stemmer):
         self._stemmer = stemmer
@@ -55,7 +90,12 @@ class LexRankSummarizer(AbstractSummarizer): #TODO stemmer and stopwords are now
     LexRank: Graph-based Centrality as Salience in Text Summarization
     Source: http://tangra.si.umich.edu/~radev/lexrank/lexrank.pdf
     """
-    def __init__(self, stemmer, embedder_config, threshold, epsilon, nlp):
+    DEFAULT_BLOCK_SIZE = 1000
+    DEFAULT_DAMPING = 1.0
+    DEFAULT_MAX_ITERATIONS = 1000
+
+    def __init__(self, stemmer, embedder_config, threshold, epsilon, nlp, sparse=False, block_size=DEFAULT_BLOCK_SIZE,
+                 damping=DEFAULT_DAMPING, max_iterations=DEFAULT_MAX_ITERATIONS, top_k_stable=False, lsh=None):
         super().__init__(stemmer)
 
         self.embedder_config = embedder_config
@@ -64,10 +104,33 @@ class LexRankSummarizer(AbstractSummarizer): #TODO stemmer and stopwords are now
         self.threshold = threshold or 0.1
         self.epsilon = epsilon or 0.1
 
-    def summarize(self, docs: Iterable[Document]):
+        # In sparse mode, similarities are computed `block_size` rows at a time and only the edges of the graph
+        # are kept, so memory scales with the number of edges rather than |sentences|²
+        self.sparse = sparse
+        self.block_size = block_size or LexRankSummarizer.DEFAULT_BLOCK_SIZE
+
+        # Solver settings: a damping factor below 1 teleports to a random sentence with probability 1 - damping,
+        # and `top_k_stable` stops once the best sentences within the word limit stop changing
+        self.damping = LexRankSummarizer.DEFAULT_DAMPING if damping is None else damping
+        self.max_iterations = max_iterations or LexRankSummarizer.DEFAULT_MAX_ITERATIONS
+        self.top_k_stable = top_k_stable
+
+        # With an `HyperplaneLSH`, sentences are only compared to their candidate neighbours rather than to every
+        # other sentence, which gives an approximate (sparse) graph
+        self.lsh = lsh
+
+        # The embedder, sentences, similarities, graph and scores of the last call to `summarize` (or `update`),
+        # used by `select_sentences` and `update`
+        self.__embedder, self.__sentences, self.__similarities = None, [], None
+        self.__sentence_rows = dict()
+        self.__matrix, self.__scores = None, None
+
+    def summarize(self, docs: Iterable[Document], word_limit: int = None, start=None):
         """
         Generate summary of the document
         :param document: Input document to be summarized - raw string
+        :param word_limit: the word limit of the summary, used by the top-k stable stopping rule
+        :param start: optionally, a vector of scores (e.g. from a previous run) to start the power method from
         :param num_sentences_count: integer number of best sentences to be returned
         :param max_word_count: integer max number of words in summary
         :param vec_type: string to identify the type of vector representation to use for sentences
@@ -79,100 +142,290 @@ class LexRankSummarizer(AbstractSummarizer): #TODO stemmer and stopwords are now
 
         sentences = [sent for doc in docs for sent in doc.sentences]
 
-        raw_sentences = [sent.text for sent in sentences]
-        embedder = Embedder.from_config(self.embedder_config, self.nlp, raw_sentences)
+        embedder = Embedder.from_config(self.embedder_config, self.nlp, sentences)
 
         for sent in sentences:
             sent.embedding = embedder.embed(sent)
 
-        matrix = self._create_matrix(embedder, sentences, self.threshold)
-        scores = self.power_method(matrix, self.epsilon)
+        # keep the similarities around so that selecting the summary doesn't have to compute them again
+        similarities = None if self.sparse or self.lsh is not None else self._similarity_matrix(embedder, sentences)
+
+        matrix = self._create_matrix(embedder, sentences, self.threshold, similarities)
+        scores = self.rank(matrix, sentences, word_limit, start)
+        self.__keep(embedder, sentences, similarities, matrix, scores)
         ratings = dict(zip(sentences, scores))
 
         return self._get_best_sentences(sentences, ratings)
 
+    def update(self, docs: Iterable[Document], word_limit: int = None):
+        """
+        Adds new documents (e.g. the update docset of a topic, or newly arrived stories) to the graph of the last
+        call to `summarize` and re-ranks. Only the similarities of the new sentences to every sentence are computed,
+        and the power method starts from the previous scores, so the work grows with the number of new sentences
+        rather than with the size of the whole topic.
+
+        Note: the TF-IDF vocabulary and idf weights stay those of the original documents.
+
+        :param docs: the new documents
+        :param word_limit: the word limit of the summary, used by the top-k stable stopping rule
+        :return: the new sentences, sorted by descending LexRank score in the updated graph
+        """
+        if self.__embedder is None:
+            raise ValueError("LexRank can only be updated after a call to summarize")
+
+        new_sentences = [sent for doc in docs for sent in doc.sentences]
+        if not new_sentences:
+            return tuple()
+
+        embedder = self.__embedder
+        embedder.add_sentences(new_sentences)
+        for sent in new_sentences:
+            sent.embedding = embedder.embed(sent)
 
-    def _create_matrix(self, embedder, sentences, threshold):
+        sentences_count = len(self.__sentences)
+        sentences = self.__sentences + new_sentences
+        new_similarities = embedder.similarity_matrix(new_sentences, sentences)
+        new_similarities = new_similarities.toarray() if issparse(new_similarities) else np.asarray(new_similarities)
+
+        if self.__similarities is not None:
+            similarities = np.block([[self.__similarities, new_similarities[:, :sentences_count].T],
+                                     [new_similarities]])
+            matrix = self._create_matrix(embedder, sentences, self.threshold, similarities)
+        else:
+            # add the new rows and columns to the edges of the existing sparse graph
+            similarities = None
+            new_edges = csr_matrix(new_similarities > self.threshold)
+            adjacency = vstack((hstack((self.__matrix, new_edges[:, :sentences_count].T)), new_edges), format="csr")
+            matrix = self._normalize_graph(adjacency, embedder.dtype)
+
+        # new sentences start from the average score
+        start = np.concatenate((self.__scores, np.full((len(new_sentences), ), np.mean(self.__scores))))
+        scores = self.rank(matrix, sentences, word_limit, start)
+        self.__keep(embedder, sentences, similarities, matrix, scores)
+        ratings = dict(zip(new_sentences, scores[sentences_count:]))
+
+        return self._get_best_sentences(new_sentences, ratings)
+
+    def __keep(self, embedder, sentences, similarities, matrix, scores):
+        """Keeps the state of the last ranking for `select_sentences` and `update`."""
+        self.__embedder, self.__sentences, self.__similarities = embedder, sentences, similarities
+        self.__sentence_rows = {sent: row for row, sent in enumerate(sentences)}
+        self.__matrix, self.__scores = matrix, scores
+
+
+    def _create_matrix(self, embedder, sentences, threshold, similarities=None):
         """
-        Creates matrix of shape |sentences|×|sentences|. Based on cosine similarity between sentences
+        Creates matrix of shape |sentences|×|sentences|. Based on cosine similarity between sentences. The matrix is
+        of the embedder's float type
+
+        :param sentences: a list of sentence embedding objects
+        :param threshold: float, lexrank hyperparameter
+        :param similarities: optionally, the already computed dense similarity matrix of the sentences
+        """
+        if self.lsh is not None:
+            return self._create_lsh_matrix(embedder, sentences, threshold)
+        if self.sparse:
+            return self._create_sparse_matrix(embedder, sentences, threshold)
+
+        if similarities is None:
+            similarities = self._similarity_matrix(embedder, sentences)
+
+        # connect every pair of sentences more similar than the threshold
+        matrix = (similarities > threshold).astype(embedder.dtype)
+
+        # normalize each row by its degree, leaving isolated sentences' rows empty
+        degrees = matrix.sum(axis=1)
+        degrees[degrees == 0] = 1
+
+        return matrix / degrees[:, np.newaxis]
+
+    def _create_sparse_matrix(self, embedder, sentences, threshold):
+        """
+        Creates the same matrix as `_create_matrix` as a scipy CSR matrix, one block of rows at a time.
 
         :param sentences: a list of sentence embedding objects
         :param threshold: float, lexrank hyperparameter
         """
-        # create matrix |sentences|×|sentences| filled with zeroes
         sentences_count = len(sentences)
 
-        matrix = np.zeros((sentences_count, sentences_count))
-        degrees = np.zeros((sentences_count, ))
+        # rows are found in order, so the column indices of the edges are already in CSR order
+        columns, degrees = [], np.zeros((sentences_count, ), dtype=np.int64)
+        for start, block in self._similarity_blocks(embedder, sentences):
+            block_rows, block_columns = np.nonzero(block > threshold)
+            degrees[start:start + len(block)] = np.bincount(block_rows, minlength=len(block))
+            columns.append(block_columns)
+
+        indptr = np.concatenate(([0], np.cumsum(degrees)))
+        indices = np.concatenate(columns) if columns else np.zeros((0, ), dtype=np.int64)
+
+        # normalize each row by its degree
+        data = np.repeat(1.0 / np.maximum(degrees, 1), degrees).astype(embedder.dtype)
+
+        return csr_matrix((data, indices, indptr), shape=(sentences_count, sentences_count))
+
+    def _create_lsh_matrix(self, embedder, sentences, threshold):
+        """
+        Creates an approximation of the `_create_matrix` matrix as a scipy CSR matrix. Only the pairs of sentences
+        which `self.lsh` finds as candidate neighbours are compared, and those above the threshold are linked.
+
+        :param sentences: a list of sentence embedding objects
+        :param threshold: float, lexrank hyperparameter
+        """
+        sentences_count = len(sentences)
+        embeddings = embedder.embed_many(sentences)
 
-        for row_idx, col_idx in product(range(sentences_count), repeat=2):
-            matrix[row_idx, col_idx] = self._cosine_similarity(embedder, sentences[row_idx],
-                                                              sentences[col_idx])
+        # compare every sentence to itself as well as to its candidate neighbours
+        pair_rows, pair_columns = self.lsh.candidate_pairs(embeddings)
+        pair_rows = np.concatenate((np.arange(sentences_count), pair_rows))
+        pair_columns = np.concatenate((np.arange(sentences_count), pair_columns))
 
-            if matrix[row_idx, col_idx] > threshold:
-                matrix[row_idx, col_idx] = 1.0
-                degrees[row_idx] += 1
-            else:
-                matrix[row_idx, col_idx] = 0
+        linked = self.lsh.pair_similarities(embeddings, pair_rows, pair_columns) > threshold
+        pair_rows, pair_columns = pair_rows[linked], pair_columns[linked]
+        off_diagonal = pair_rows != pair_columns
+        rows = np.concatenate((pair_rows, pair_columns[off_diagonal]))
+        columns = np.concatenate((pair_columns, pair_rows[off_diagonal]))
 
-        for row, col in product(range(sentences_count), repeat=2):
-            if degrees[row] == 0:
-                degrees[row] = 1
+        return self._normalize_graph(csr_matrix((np.ones(len(rows)), (rows, columns)),
+                                                shape=(sentences_count, sentences_count)), embedder.dtype)
 
-            matrix[row][col] = matrix[row][col] / degrees[row]
+    @staticmethod
+    def _normalize_graph(adjacency, dtype=np.float64):
+        """
+        Normalizes each row of a sparse adjacency matrix by its degree.
 
+        :param adjacency: a sparse matrix whose non-zero entries are edges
+        :param dtype: the float type of the matrix
+        :return: a float CSR matrix
+        """
+        matrix = csr_matrix(adjacency, dtype=dtype)
+        matrix.data[:] = 1.0
+        degrees = np.diff(matrix.indptr)
+        matrix.data /= np.repeat(np.maximum(degrees, 1), degrees)
         return matrix
 
-    def _cosine_similarity(self, embedder, sentence1, sentence2):
+    def _similarity_blocks(self, embedder, sentences):
+        """
+        Computes the cosine similarity of every pair of sentences, in dense blocks of `block_size` rows.
+
+        :param sentences: a list of sentence objects
+        :return: an iterator of (index of the block's first row, dense block of similarities) tuples
+        """
+        for start, block in embedder.similarity_blocks(sentences, self.block_size):
+            yield start, block.toarray() if issparse(block) else np.asarray(block)
+
+    def _similarity_matrix(self, embedder, sentences):
+        """
+        Computes the cosine similarity of every pair of sentences with a single call to the embedder.
+        It's cosine similarity of two sentences (vectors) A, B computed as cos(x, y) = A . B / (|A| . |B|)
+
+        :param sentences: a list of sentence objects
+        :return: a dense |sentences|×|sentences| array of similarities, from -1.0 for opposite sentences
+        to 1.0 for the same sentence
+        """
+        sims = embedder.similarity_matrix(sentences)
+        return sims.toarray() if issparse(sims) else np.asarray(sims)
+
+    def rank(self, matrix, sentences, word_limit=None, start=None):
         """
-        Take 2 sentence vectors, compute cosine similarity.
-        It's cosine similarity of these two sentences (vectors) A, B computed as cos(x, y) = A . B / (|A| . |B|)
+        Scores the sentences with the power method, using this summarizer's solver settings.
 
-        :param sentence1: vector representation of first sentence
-        :param sentence2: vector representation of second sentence
-        :rtype: float
-        :return: Returns -1.0 for opposite similarity, 1.0 for the same sentence and zero for no similarity between sentences.
+        :param matrix: the matrix from `_create_matrix`
+        :param sentences: the sentences of the matrix
+        :param word_limit: the word limit of the summary, required by the top-k stable stopping rule
+        :param start: optionally, a vector of scores to start from
+        :return: the LexRank score of each sentence
         """
-        return embedder.cosine_similarity(sentence1, sentence2)
+        stop = None
+        if self.top_k_stable and word_limit is not None:
+            stop = TopKStable([len(sentence) for sentence in sentences], word_limit)
+
+        return self.power_method(matrix, self.epsilon, self.damping, self.max_iterations, start, stop)
 
     @staticmethod
-    def power_method(matrix, epsilon):
+    def power_method(matrix, epsilon, damping=DEFAULT_DAMPING, max_iterations=None, start=None, stop=None):
+        """
+        Finds the stationary distribution of the random walk over `matrix`.
+
+        :param matrix: a row-normalized dense array or scipy sparse matrix
+        :param epsilon: stop once the L2 change of the scores is at most `epsilon`
+        :param damping: the probability of following an edge rather than jumping to a random sentence. With a damping
+        below 1, the mass of sentences with no edges is also spread over every sentence.
+        :param max_iterations: the maximum number of iterations, or None for no limit
+        :param start: the vector to start from, uniform by default. It is normalized to sum to 1
+        :param stop: optionally, a callable which is given the scores after each iteration and returns True to stop
+        :return: the score of each sentence
+        """
         transposed_matrix = matrix.T
-        sentences_count = len(matrix)
-        p_vector = np.array([1.0 / sentences_count] * sentences_count)
+        sentences_count = matrix.shape[0]
+        if start is None:
+            p_vector = np.array([1.0 / sentences_count] * sentences_count)
+        else:
+            p_vector = np.asarray(start, dtype=np.float64) / np.sum(start)
         lambda_val = 1.0
 
-        while lambda_val > epsilon:
-            next_p = np.dot(transposed_matrix, p_vector)
+        if damping < 1.0:
+            sinks = np.asarray(matrix.sum(axis=1)).ravel() == 0
+
+        iterations = 0
+        while lambda_val > epsilon and (max_iterations is None or iterations < max_iterations):
+            next_p = transposed_matrix.dot(p_vector)
+            if damping < 1.0:
+                next_p = damping * (next_p + p_vector[sinks].sum() / sentences_count) + \
+                         (1.0 - damping) / sentences_count
             lambda_val = np.linalg.norm(np.subtract(next_p, p_vector))
             p_vector = next_p
+            iterations += 1
 
-        return p_vector
+            if stop is not None and stop(p_vector):
+                break
 
+        return p_vector
 
-    def remove_duplicate_sent(self, sentences, redundancy_threshold):
-        """Remove sentences that have high similarity to top sentences - must be called after summary candidate are generated"""
 
-        final_sentences_list = []
-        sent_idx_to_remove = []
+    def select_sentences(self, ranked_sentences, word_limit, redundancy_threshold, chosen_before=()):
+        """
+        Greedily builds the summary from the sentences ranked by the last call to `summarize`. Sentences are taken in
+        score order, skipping those which don't fit in the word limit or are at least `redundancy_threshold` similar
+        to a sentence already chosen, until nothing else can fit.
+
+        The similarities computed while ranking are reused; in sparse mode, only the similarities of the chosen
+        sentences are computed.
+
+        :param ranked_sentences: the sentences, best first
+        :param word_limit: the maximum number of words in the summary
+        :param redundancy_threshold: the similarity at which a sentence is redundant with a chosen one
+        :param chosen_before: sentences of an earlier summary (e.g. of the original docset, for an update summary),
+        which the chosen sentences must not be redundant with either
+        :return: the chosen sentences, best first
+        """
+        redundancy_threshold = float(redundancy_threshold)
+        lengths = np.array([len(sentence) for sentence in ranked_sentences], dtype=np.int64)
+        # the shortest sentence from each position onwards, to stop as soon as nothing else can fit
+        shortest_remaining = np.minimum.accumulate(lengths[::-1])[::-1]
 
-        sentences_count = len(sentences)
-        matrix = np.zeros((sentences_count, sentences_count))
+        max_similarity = np.full((len(self.__sentences), ), -np.inf)
+        for sentence in chosen_before:
+            max_similarity = np.maximum(max_similarity, self.__similarity_row(self.__sentence_rows[sentence]))
 
-        raw_sentences = [sent.text for sent in sentences]
-        embedder = Embedder.from_config(self.embedder_config, self.nlp, raw_sentences)
+        chosen, remaining_words = [], word_limit
+        for position, sentence in enumerate(ranked_sentences):
+            if shortest_remaining[position] > remaining_words:
+                break
 
-        for row_idx, col_idx in product(range(sentences_count), repeat=2):
-            matrix[row_idx, col_idx] = self._cosine_similarity(embedder, sentences[row_idx],
-                                                              sentences[col_idx])
+            row = self.__sentence_rows[sentence]
+            if lengths[position] > remaining_words or max_similarity[row] >= redundancy_threshold:
+                continue
 
+            chosen.append(sentence)
+            remaining_words -= lengths[position]
+            max_similarity = np.maximum(max_similarity, self.__similarity_row(row))
 
-        for i in range(0, len(sentences)-1):
-            for j in range(i+1, len(sentences)):
-                if matrix[i][j] >= float(redundancy_threshold): #add to result if less than threshold; else remove
-                    sent_idx_to_remove.append(j) #adding sent index
+        return chosen
 
-        final_sentences_list = [sentences[idx] for idx in range(0, sentences_count) if idx not in sent_idx_to_remove]
+    def __similarity_row(self, row):
+        """The similarity of one sentence of the last call to `summarize` to every sentence."""
+        if self.__similarities is not None:
+            return self.__similarities[row]
 
-        #list of sentence objects
-        return final_sentences_list
+        sims = self.__embedder.similarity_matrix([self.__sentences[row]], self.__sentences)
+        return (sims.toarray() if issparse(sims) else np.asarray(sims)).ravel()
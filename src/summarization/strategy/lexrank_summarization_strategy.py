@@ -5,20 +5,27 @@ from typing import TypeVar, Type, Dict, Set, Iterable
 T = TypeVar("T", bound="SummarizationStrategy")
 
 from .lexrank import LexRankSummarizer
+from .lsh import HyperplaneLSH
 
 from spacy.language import Language
 
 from nltk.stem import PorterStemmer
 
-from . import Document, Sentence, Embedder
+from . import Document, Sentence, Embedder, Topic
 
 @SummarizationStrategy.register_strategy
 class LexRankSummarizationStrategy(SummarizationStrategy):
 
-    def __init__(self, embedder_config, threshold, epsilon, similarity_threshold, nlp):
+    def __init__(self, embedder_config, threshold, epsilon, similarity_threshold, nlp, sparse=False,
+                 block_size=LexRankSummarizer.DEFAULT_BLOCK_SIZE, damping=LexRankSummarizer.DEFAULT_DAMPING,
+                 max_iterations=LexRankSummarizer.DEFAULT_MAX_ITERATIONS, top_k_stable=False, lsh=None):
         stemmer = PorterStemmer()
         self.similarity_threshold = similarity_threshold
-        self.lexrank = LexRankSummarizer(stemmer, embedder_config, threshold, epsilon, nlp)
+        self.lexrank = LexRankSummarizer(stemmer, embedder_config, threshold, epsilon, nlp, sparse, block_size,
+                                         damping, max_iterations, top_k_stable, lsh)
+
+        # The last topic summarized and its summary, which update summaries build on
+        self.__topic, self.__summary = None, []
 
     name = "lexrank"
 
@@ -26,6 +33,18 @@ class LexRankSummarizationStrategy(SummarizationStrategy):
     THRESHOLD_CONFIG_KEY = "threshold"
     EPSILON_CONFIG_KEY = "epsilon"
     REDUNDANCY_THRESHOLD_KEY = "redundancy_tuner"  #comment out to turn off redundany removal based on thresholding
+    SPARSE_CONFIG_KEY = "sparse"  # build the LexRank graph block-wise as a sparse matrix, for very large topics
+    BLOCK_SIZE_CONFIG_KEY = "block_size"
+    DAMPING_CONFIG_KEY = "damping"
+    MAX_ITERATIONS_CONFIG_KEY = "max_iterations"
+    TOP_K_STABLE_CONFIG_KEY = "top_k_stable"  # stop the power method once the top sentences within the word limit settle
+    GRAPH_CONFIG_KEY = "graph"  # "exact" (the default) or "lsh" for an approximate nearest neighbour graph
+    LSH_TABLES_CONFIG_KEY = "lsh_tables"  # more tables find more neighbours, but compare more pairs
+    LSH_BITS_CONFIG_KEY = "lsh_bits"  # more bits compare fewer pairs, but miss more neighbours
+    LSH_SEED_CONFIG_KEY = "lsh_seed"
+
+    EXACT_GRAPH = "exact"
+    LSH_GRAPH = "lsh"
 
     @classmethod
     def from_strategy_config(cls: Type[T], config: Dict[str, dict], nlp: Language) -> T:
@@ -39,15 +58,44 @@ class LexRankSummarizationStrategy(SummarizationStrategy):
         epsilon = float(config.get(LexRankSummarizationStrategy.EPSILON_CONFIG_KEY) or 0.1)
         embedder_config = config.get(LexRankSummarizationStrategy.EMBEDDER_CONFIG_KEY)
         similarity_threshold = float(config.get(LexRankSummarizationStrategy.REDUNDANCY_THRESHOLD_KEY) or 1.0)
+        sparse = bool(config.get(LexRankSummarizationStrategy.SPARSE_CONFIG_KEY, False))
+        block_size = int(config.get(LexRankSummarizationStrategy.BLOCK_SIZE_CONFIG_KEY) or LexRankSummarizer.DEFAULT_BLOCK_SIZE)
 
-        return cls(embedder_config, threshold, epsilon, similarity_threshold, nlp)
+        damping = float(config.get(LexRankSummarizationStrategy.DAMPING_CONFIG_KEY) or LexRankSummarizer.DEFAULT_DAMPING)
+        max_iterations = int(config.get(LexRankSummarizationStrategy.MAX_ITERATIONS_CONFIG_KEY) or LexRankSummarizer.DEFAULT_MAX_ITERATIONS)
+        top_k_stable = bool(config.get(LexRankSummarizationStrategy.TOP_K_STABLE_CONFIG_KEY, False))
 
+        graph = str(config.get(LexRankSummarizationStrategy.GRAPH_CONFIG_KEY) or LexRankSummarizationStrategy.EXACT_GRAPH).lower()
+        if graph == LexRankSummarizationStrategy.EXACT_GRAPH:
+            lsh = None
+        elif graph == LexRankSummarizationStrategy.LSH_GRAPH:
+            lsh = HyperplaneLSH(int(config.get(LexRankSummarizationStrategy.LSH_TABLES_CONFIG_KEY) or HyperplaneLSH.DEFAULT_TABLES),
+                                int(config.get(LexRankSummarizationStrategy.LSH_BITS_CONFIG_KEY) or HyperplaneLSH.DEFAULT_BITS),
+                                int(config.get(LexRankSummarizationStrategy.LSH_SEED_CONFIG_KEY) or HyperplaneLSH.DEFAULT_SEED))
+        else:
+            raise ValueError("No lexrank graph named '{0}'".format(graph))
 
-    def get_candidate_sentences(self, docs: Iterable[Document], word_limit: int) -> Iterable[Sentence]:
+        return cls(embedder_config, threshold, epsilon, similarity_threshold, nlp, sparse, block_size,
+                   damping, max_iterations, top_k_stable, lsh)
+
+
+    def summarize(self, topic: Topic, word_limit: int) -> Iterable[Sentence]:
+        self.__summary = super().summarize(topic, word_limit)
+        self.__topic = topic
+        return self.__summary
 
-        sent_list = self.lexrank.summarize(docs)
+    def summarize_update(self, topic: Topic, word_limit: int) -> Iterable[Sentence]:
+        """Adds the update stories to the LexRank graph of the topic's original stories, and summarizes them,
+        avoiding sentences which are redundant with the original summary."""
+        if self.__topic is not topic:
+            self.summarize(topic, word_limit)
+
+        sent_list = self.lexrank.update(topic.update_stories, word_limit)
+        return self.lexrank.select_sentences(sent_list, word_limit, self.similarity_threshold, self.__summary)
+
+    def get_candidate_sentences(self, docs: Iterable[Document], word_limit: int) -> Iterable[Sentence]:
 
-        #near full-sentence redundancy removal during selecting top ranked sentences within word-limit
-        sent_list_no_duplicates = self.lexrank.remove_duplicate_sent(sent_list, self.similarity_threshold)
+        sent_list = self.lexrank.summarize(docs, word_limit)
 
-        return self.take_while_under_word_count(sent_list_no_duplicates, word_limit)
+        #near full-sentence redundancy removal while selecting top ranked sentences within word-limit
+        return self.lexrank.select_sentences(sent_list, word_limit, self.similarity_threshold)
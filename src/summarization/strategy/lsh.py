@@ -0,0 +1,82 @@
+from typing import Tuple
+
+import numpy as np
+from scipy.sparse import issparse
+from sklearn.preprocessing import normalize
+
+
+class HyperplaneLSH(object):
+    """Random-hyperplane locality sensitive hashing for cosine similarity.
+
+    Each table hashes an embedding to the side of `bits` random hyperplanes it falls on, so two embeddings land in
+    the same bucket with a probability that grows with their cosine similarity. Sentences which share a bucket in
+    any table are candidate neighbours; every other pair is never compared.
+
+    More tables find more of the true neighbours (recall), at the cost of more candidate pairs. More bits make the
+    buckets smaller, which is faster but misses more neighbours.
+    """
+
+    DEFAULT_TABLES = 16
+    DEFAULT_BITS = 4
+    DEFAULT_SEED = 573
+
+    def __init__(self, tables: int = DEFAULT_TABLES, bits: int = DEFAULT_BITS, seed: int = DEFAULT_SEED):
+        """
+        :param tables: the number of hash tables
+        :param bits: the number of hyperplanes (bits of the hash) in each table, at most 62
+        :param seed: the seed of the random hyperplanes
+        """
+        if not 0 < bits <= 62:
+            raise ValueError("The number of LSH bits must be between 1 and 62, not {0}".format(bits))
+        self.tables = tables
+        self.bits = bits
+        self.seed = seed
+
+    def signatures(self, embeddings) -> np.array:
+        """Hashes each embedding in each table.
+
+        :param embeddings: a dense or sparse matrix with one embedding per row
+        :return: a |embeddings|×tables array of hashes
+        """
+        # draw the hyperplanes table by table, so that adding tables keeps the hashes of the first ones
+        random = np.random.RandomState(self.seed)
+        hyperplanes = np.hstack([random.randn(embeddings.shape[1], self.bits) for _ in range(self.tables)])
+        sides = np.asarray(embeddings.dot(hyperplanes)) > 0
+
+        powers = np.left_shift(1, np.arange(self.bits, dtype=np.int64))
+        return sides.reshape(-1, self.tables, self.bits).astype(np.int64).dot(powers)
+
+    def candidate_pairs(self, embeddings) -> Tuple[np.array, np.array]:
+        """Finds the pairs of embeddings which share a bucket in at least one table.
+
+        :param embeddings: a dense or sparse matrix with one embedding per row
+        :return: the (rows, columns) of each candidate pair, with rows < columns and no pair repeated
+        """
+        count = embeddings.shape[0]
+        pair_keys = []
+        for table in self.signatures(embeddings).T:
+            order = np.argsort(table, kind="stable")
+            # split the sorted rows wherever the hash changes
+            buckets = np.split(order, np.flatnonzero(np.diff(table[order])) + 1)
+            for bucket in buckets:
+                if len(bucket) > 1:
+                    rows, columns = np.triu_indices(len(bucket), k=1)
+                    first, second = np.minimum(bucket[rows], bucket[columns]), np.maximum(bucket[rows], bucket[columns])
+                    pair_keys.append(first * count + second)
+
+        if not pair_keys:
+            return np.zeros((0, ), dtype=np.int64), np.zeros((0, ), dtype=np.int64)
+        pair_keys = np.unique(np.concatenate(pair_keys))
+        return pair_keys // count, pair_keys % count
+
+    @staticmethod
+    def pair_similarities(embeddings, rows: np.array, columns: np.array) -> np.array:
+        """Computes the exact cosine similarity of just the given pairs of embeddings.
+
+        :param embeddings: a dense or sparse matrix with one embedding per row
+        :return: the similarity of each (row, column) pair
+        """
+        embeddings = normalize(embeddings)
+        if issparse(embeddings):
+            return np.asarray(embeddings[rows].multiply(embeddings[columns]).sum(axis=1)).ravel()
+        return np.einsum("ij,ij->i", embeddings[rows], embeddings[columns])
@@ -75,6 +75,11 @@ class SummarizationStrategy(metaclass=ABCMeta):
         """Summarize a set of documents within a given word limit."""
         return self.get_candidate_sentences(topic.stories, word_limit)
 
+    def summarize_update(self, topic: Topic, word_limit: int) -> Set[Sentence]:
+        """Summarize the update stories (docsetB) of a topic within a given word limit. By default, they are
+        summarized on their own."""
+        return self.get_candidate_sentences(topic.update_stories, word_limit)
+
     @abstractmethod
     def get_candidate_sentences(self, docs: Set[Document], word_limit: int) -> Set[Sentence]:
         """Gets candidate sentences that describe the topic within the word limit"""
\ No newline at end of file
@@ -26,6 +26,10 @@ class Summarizer(object):
         """Uses the provided summarization strategy to summarize a set documents."""
         return self.strategy.summarize(topic, self.word_limit)
 
+    def summarize_update(self, topic: Topic):
+        """Uses the provided summarization strategy to summarize the update stories of a topic."""
+        return self.strategy.summarize_update(topic, self.word_limit)
+
     @classmethod
     def from_config(cls, config: Dict, nlp: Language):
 
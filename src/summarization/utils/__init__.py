@@ -1,6 +1,11 @@
 from .topic import Topic
 from .document import Document
-from .sentence import Sentence
+from .sentence import Sentence, SentenceRecord, SentenceStore
 from .embedder import Embedder
 from .spacy_embedder import SpacyEmbedder
-from .tfidf_embedder import TfidfEmbedder
\ No newline at end of file
+from .tfidf_embedder import TfidfEmbedder
+from .embedding_cache import CachingEmbedder, EmbeddingCache
+from .vector_table import VectorTable
+from .idf_model import IdfModel
+from .hashing_tfidf_embedder import HashingTfidfEmbedder
+from .pipeline import DEFAULT_PIPELINE, load_pipeline
\ No newline at end of file
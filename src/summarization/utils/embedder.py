@@ -1,9 +1,13 @@
 from abc import ABCMeta, abstractmethod
-from typing import Type, Dict, TypeVar, Iterable
+from typing import Type, Dict, TypeVar, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
 
 from sklearn.metrics import pairwise
+from sklearn.preprocessing import normalize
 from spacy.language import Language
 
+from .quantization import QuantizedEmbeddings
 from .sentence import Sentence
 
 T = TypeVar("T", bound="Embedder")
@@ -16,6 +20,17 @@ class Embedder(metaclass=ABCMeta):
     __name_to_embedder = dict()
 
     CONFIG_EMBED_NAME_KEY = "name"
+    CACHE_CONFIG_KEY = "cache"  # wrap the embedder in a persistent embedding cache
+    DTYPE_CONFIG_KEY = "dtype"
+    QUANTIZE_CONFIG_KEY = "quantize"
+
+    # The float types embeddings and similarities can be computed in. Ranking doesn't need double precision.
+    DTYPES = {"float32": np.float32, "float64": np.float64}
+    DEFAULT_DTYPE = np.float32
+    QUANTIZATIONS = ("int8", )
+
+    # Whether the embeddings are dense vectors, rather than sparse rows of a matrix fit on the sentences
+    dense = True
 
     @property
     @abstractmethod
@@ -33,12 +48,22 @@ class Embedder(metaclass=ABCMeta):
         cls.__name_to_embedder[scls.name] = scls
         return scls
 
-    def __init__(self, nlp: Language):
+    def __init__(self, nlp: Language, dtype=DEFAULT_DTYPE, quantize: bool = False):
+        """
+        :param nlp: the SpaCy language model
+        :param dtype: the float type of the embeddings and similarities
+        :param quantize: whether to compute the similarities of dense embeddings from int8-quantized embeddings
+        """
         self.nlp = nlp
+        self.dtype = dtype
+        self.quantize = quantize
 
     @classmethod
-    def from_config(cls: Type[T], config: Dict, nlp: Language, sentences: Iterable[str]) -> T:
-        """Reads the summarization strategy from a dictionary."""
+    def from_config(cls: Type[T], config: Dict, nlp: Language, sentences: Iterable[Union[str, Sentence]]) -> T:
+        """Reads the summarization strategy from a dictionary.
+
+        :param sentences: the sentences to be embedded, either as raw strings or as `Sentence`s
+        """
 
         embedder_name = config.get(Embedder.CONFIG_EMBED_NAME_KEY)
         if embedder_name is None:
@@ -48,21 +73,113 @@ class Embedder(metaclass=ABCMeta):
         if embedder is None:
             raise ValueError("No embedder named '{0}'".format(embedder_name))
 
+        if config.get(Embedder.CACHE_CONFIG_KEY):
+            # Imported here since the caching embedder is itself an `Embedder`
+            from .embedding_cache import CachingEmbedder
+            return CachingEmbedder.from_embedding_config(config, nlp, sentences)
+
         # Create the strategy instance from the strategy config.
         return embedder.from_embedding_config(config, nlp, sentences)
 
+    @staticmethod
+    def precision_from_config(config: Dict) -> Tuple[type, bool]:
+        """Reads the float type and quantization of the embeddings from an embedder config.
+
+        :return: a (dtype, quantize) tuple
+        """
+        dtype_name = config.get(Embedder.DTYPE_CONFIG_KEY)
+        if dtype_name is not None and dtype_name not in Embedder.DTYPES:
+            raise ValueError("No embedding dtype named '{0}'; expected one of {1}"
+                             .format(dtype_name, ", ".join(sorted(Embedder.DTYPES))))
+        dtype = Embedder.DTYPES[dtype_name] if dtype_name is not None else Embedder.DEFAULT_DTYPE
+
+        quantization = config.get(Embedder.QUANTIZE_CONFIG_KEY)
+        if quantization is True:
+            quantization = Embedder.QUANTIZATIONS[0]
+        if quantization and quantization not in Embedder.QUANTIZATIONS:
+            raise ValueError("No embedding quantization named '{0}'; expected one of {1}"
+                             .format(quantization, ", ".join(Embedder.QUANTIZATIONS)))
+        return dtype, bool(quantization)
+
     @classmethod
     @abstractmethod
-    def from_embedding_config(cls, config: Dict, nlp: Language, sentences: Iterable[str]) -> T:
+    def from_embedding_config(cls, config: Dict, nlp: Language, sentences: Iterable[Union[str, Sentence]]) -> T:
         """Instantiates a subclass of `Embedder` given appropriate arguments."""
 
+    def fingerprint(self) -> str:
+        """Identifies the embedder and the SpaCy model it uses, e.g. to key cached embeddings."""
+        if self.nlp is None:
+            return self.name
+        return "{0}|{1}_{2}-{3}".format(self.name, self.nlp.meta.get("lang"), self.nlp.meta.get("name"),
+                                        self.nlp.meta.get("version"))
+
+    def add_sentences(self, sentences: Iterable[Union[str, Sentence]]):
+        """Makes the embedder able to embed sentences it wasn't created with, e.g. newly arrived stories.
+        Embedders which don't depend on the whole set of sentences have nothing to do.
+
+        :param sentences: the new sentences, either as raw strings or as `Sentence`s
+        """
+
     @abstractmethod
     def embed(self, sentence):
         """Creates an embedding of a sentence"""
 
+    def embed_many(self, sentences: List[Sentence]):
+        """Creates the embeddings of several sentences at once.
+
+        :param sentences: the sentences to be embedded
+        :return: a matrix (dense or CSR) with one row per sentence
+        """
+        return np.vstack([self.embed(sentence) for sentence in sentences]).astype(self.dtype, copy=False)
+
     def cosine_similarity(self, sentence1: Sentence, sentence2: Sentence) -> float:
         """Typical cosine similarity for most vectors.
 
         Note: this will be overridden because TF-IDF cosine similarity is different.
         """
-        return pairwise.cosine_similarity(sentence1.embedding, sentence2.embedding)[0][0]
\ No newline at end of file
+        return pairwise.cosine_similarity(sentence1.embedding, sentence2.embedding)[0][0]
+
+    def similarity_matrix(self, sentences: List[Sentence], others: List[Sentence] = None) -> np.array:
+        """Calculates the cosine similarity of every pair of sentences at once by stacking their embeddings
+        into a matrix, rather than calling `cosine_similarity` for each pair.
+
+        :param sentences: the sentences to compare
+        :param others: optionally, the sentences to compare them to; `sentences` themselves by default
+        :return: a |sentences|×|others| matrix (dense or sparse) of similarities
+        """
+        if not sentences or others is not None and not others:
+            return np.zeros((len(sentences), len(sentences if others is None else others)), dtype=self.dtype)
+        return self.similarities(self.embed_many(sentences), None if others is None else self.embed_many(others))
+
+    def similarities(self, embeddings, others=None) -> np.array:
+        """Calculates the cosine similarity of every pair of rows of two embedding matrices, in `self.dtype`.
+        Dense embeddings are compared through their int8 quantization if `self.quantize` is set.
+
+        :param embeddings: a matrix with one embedding per row
+        :param others: optionally, the embeddings to compare them to; `embeddings` themselves by default
+        :return: a |embeddings|×|others| matrix of similarities
+        """
+        if self.quantize and self.dense:
+            embeddings = QuantizedEmbeddings.quantize(embeddings, self.dtype)
+            return embeddings.similarities(None if others is None else QuantizedEmbeddings.quantize(others, self.dtype))
+        return pairwise.cosine_similarity(embeddings.astype(self.dtype, copy=False),
+                                          None if others is None else others.astype(self.dtype, copy=False))
+
+    def similarity_blocks(self, sentences: List[Sentence], block_size: int) -> Iterator[Tuple[int, np.array]]:
+        """Calculates the cosine similarity of every pair of sentences a block of rows at a time, so that the whole
+        |sentences|×|sentences| matrix never has to be held in memory.
+
+        :param sentences: the sentences to compare
+        :param block_size: the number of rows in each block
+        :return: an iterator of (index of the block's first row, block_size×|sentences| similarities) tuples
+        """
+        if not sentences:
+            return
+        if self.quantize and self.dense:
+            quantized = QuantizedEmbeddings.quantize(self.embed_many(sentences), self.dtype)
+            for start in range(0, len(sentences), block_size):
+                yield start, quantized.rows(start, start + block_size).similarities(quantized)
+            return
+        embeddings = normalize(self.embed_many(sentences).astype(self.dtype, copy=False))
+        for start in range(0, len(sentences), block_size):
+            yield start, embeddings[start:start + block_size].dot(embeddings.T)
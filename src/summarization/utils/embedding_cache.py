@@ -0,0 +1,259 @@
+import atexit
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+from spacy.language import Language
+
+from .embedder import Embedder
+from .sentence import Sentence
+
+
+class EmbeddingCache(object):
+    """A persistent, size-bounded cache of dense embeddings.
+
+    The embeddings live in a memory-mapped float32 array file with a fixed number of slots, alongside a json
+    index from key to slot and a memory-mapped array of when each slot was last used. Once every slot is taken,
+    the least recently used slots are evicted. An in-memory LRU of recently used embeddings sits in front of the
+    files.
+    """
+
+    INDEX_FILE = "index.json"
+    VECTORS_FILE = "vectors.f32"
+    TICKS_FILE = "ticks.i64"
+
+    # The fraction of the slots to evict at once when the cache is full
+    EVICTION_FRACTION = 0.1
+
+    def __init__(self, cache_path: str, max_bytes: int, memory_size: int):
+        """
+        :param cache_path: the directory in which to store the cache
+        :param max_bytes: the maximum size of the embeddings file
+        :param memory_size: the number of embeddings to keep in memory
+        """
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+
+        self.width, self.capacity = None, 0
+        self.vectors, self.ticks = None, None
+        self.slots, self.keys, self.free_slots = dict(), dict(), []
+        self.next_slot, self.tick = 0, 0
+        self.dirty = False
+
+        try:
+            with open(os.path.join(cache_path, EmbeddingCache.INDEX_FILE)) as infile:
+                index = json.load(infile)
+            if index["capacity"] == max(1, max_bytes // (4 * max(index["width"], 1))):
+                self.__open(index["width"], "r+")
+                self.slots = index["slots"]
+                self.next_slot, self.tick = index["next_slot"], index["tick"]
+        except (OSError, ValueError, KeyError):
+            self.width, self.vectors, self.ticks = None, None, None
+            self.slots = dict()
+
+        self.keys = {slot: key for key, slot in self.slots.items()}
+        self.free_slots = sorted(set(range(self.next_slot)) - set(self.keys))
+
+    def __open(self, width: int, mode: str):
+        self.width = width
+        self.capacity = max(1, self.max_bytes // (4 * max(width, 1)))
+        os.makedirs(self.cache_path, exist_ok=True)
+        self.vectors = np.memmap(os.path.join(self.cache_path, EmbeddingCache.VECTORS_FILE), dtype=np.float32,
+                                 mode=mode, shape=(self.capacity, width))
+        self.ticks = np.memmap(os.path.join(self.cache_path, EmbeddingCache.TICKS_FILE), dtype=np.int64,
+                               mode=mode, shape=(self.capacity, ))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __remember(self, key: str, vector: np.array):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Gets a cached embedding.
+
+        :param key: the key of the embedding
+        :return: the embedding, or None if it isn't cached
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        self.tick += 1
+        self.ticks[slot] = self.tick
+        vector = np.array(self.vectors[slot])
+        self.__remember(key, vector)
+        return vector
+
+    def put(self, key: str, vector: np.array):
+        """Caches an embedding, evicting the least recently used embeddings if the cache is full.
+
+        :param key: the key of the embedding
+        :param vector: the embedding
+        """
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self.width is None:
+            self.__open(len(vector), "w+")
+        if len(vector) != self.width:
+            raise ValueError("Can't cache an embedding of width {0} with embeddings of width {1}"
+                             .format(len(vector), self.width))
+        self.__remember(key, vector)
+        if key in self.slots:
+            return
+
+        slot = self.__free_slot()
+        self.tick += 1
+        self.vectors[slot] = vector
+        self.ticks[slot] = self.tick
+        self.slots[key], self.keys[slot] = slot, key
+        self.dirty = True
+
+    def __free_slot(self) -> int:
+        if not self.free_slots and self.next_slot < self.capacity:
+            self.next_slot += 1
+            return self.next_slot - 1
+
+        if not self.free_slots:
+            used = np.array(sorted(self.keys), dtype=np.int64)
+            evicted = used[np.argsort(self.ticks[used], kind="stable")[:max(1, int(self.capacity * EmbeddingCache.EVICTION_FRACTION))]]
+            for slot in evicted:
+                del self.slots[self.keys.pop(int(slot))]
+            self.free_slots = sorted(int(slot) for slot in evicted)
+        return self.free_slots.pop(0)
+
+    def flush(self):
+        """Writes the cache to disk."""
+        if not self.dirty:
+            return
+        self.vectors.flush()
+        self.ticks.flush()
+        index = {
+            "width": self.width,
+            "capacity": self.capacity,
+            "next_slot": self.next_slot,
+            "tick": self.tick,
+            "slots": self.slots,
+        }
+        index_file = os.path.join(self.cache_path, EmbeddingCache.INDEX_FILE)
+        with open(index_file + ".tmp", "w") as outfile:
+            json.dump(index, outfile)
+        os.replace(index_file + ".tmp", index_file)
+        self.dirty = False
+
+
+class CachingEmbedder(Embedder):
+    """Wraps any embedder with a persistent `EmbeddingCache`, keyed by a hash of the whitespace-normalized sentence
+    text, in a cache directory of its own for each embedder and config.
+
+    Only dense embeddings are cached. Sparse embeddings (TF-IDF) depend on the vocabulary fit on a topic's own
+    sentences, so they aren't content-addressable, and are always computed by the wrapped embedder.
+    """
+
+    name = "cache"
+
+    CACHE_PATH_CONFIG_KEY = "cache_path"
+    CACHE_SIZE_CONFIG_KEY = "cache_size_mb"
+    CACHE_MEMORY_SIZE_CONFIG_KEY = "cache_memory_size"
+    CACHE_CONFIG_KEYS = (Embedder.CACHE_CONFIG_KEY, CACHE_PATH_CONFIG_KEY, CACHE_SIZE_CONFIG_KEY,
+                         CACHE_MEMORY_SIZE_CONFIG_KEY)
+
+    DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ling573", "embeddings")
+    DEFAULT_CACHE_SIZE_MB = 512
+    DEFAULT_MEMORY_SIZE = 10000
+
+    # Caches are shared by every embedder of the process with the same directory, so that the in-memory LRU
+    # lives across topics.
+    __caches = dict()
+
+    def __init__(self, embedder: Embedder, fingerprint: str, cache_path: str = DEFAULT_CACHE_PATH,
+                 max_bytes: int = DEFAULT_CACHE_SIZE_MB * 2 ** 20, memory_size: int = DEFAULT_MEMORY_SIZE):
+        """
+        :param embedder: the embedder to wrap
+        :param fingerprint: a string identifying the embedder and its config
+        :param cache_path: the directory in which to store the caches of every embedder
+        :param max_bytes: the maximum size of this embedder's cache file
+        :param memory_size: the number of embeddings to keep in memory
+        """
+        super().__init__(embedder.nlp, embedder.dtype, embedder.quantize)
+        self.embedder = embedder
+        self.dense = embedder.dense
+        cache_dir = os.path.join(cache_path, hashlib.sha1(fingerprint.encode("utf-8")).hexdigest())
+        if cache_dir not in CachingEmbedder.__caches:
+            cache = EmbeddingCache(cache_dir, max_bytes, memory_size)
+            atexit.register(cache.flush)
+            CachingEmbedder.__caches[cache_dir] = cache
+        self.cache = CachingEmbedder.__caches[cache_dir]
+
+    @staticmethod
+    def key(sentence: Union[str, Sentence]) -> str:
+        text = sentence if isinstance(sentence, str) else sentence.text
+        return hashlib.sha1(' '.join(text.split()).encode("utf-8")).hexdigest()
+
+    def add_sentences(self, sentences: Iterable[Union[str, Sentence]]):
+        self.embedder.add_sentences(sentences)
+
+    def embed(self, sentence: Sentence):
+        if not self.dense:
+            return self.embedder.embed(sentence)
+        return self.embed_many([sentence])
+
+    def embed_many(self, sentences: List[Sentence]):
+        """Gets the cached embeddings of the sentences, embedding the rest with the wrapped embedder in one batch."""
+        if not self.dense:
+            return self.embedder.embed_many(sentences)
+
+        keys = [self.key(sentence) for sentence in sentences]
+        embeddings = [self.cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = np.asarray(self.embedder.embed_many([sentences[i] for i in missing]), dtype=np.float32)
+            for i, embedding in zip(missing, computed):
+                self.cache.put(keys[i], embedding)
+                embeddings[i] = embedding
+            self.cache.flush()
+        if not embeddings:
+            return np.zeros((0, self.cache.width or 0), dtype=self.dtype)
+        return np.vstack(embeddings).astype(self.dtype, copy=False)
+
+    def cosine_similarity(self, sentence1: Sentence, sentence2: Sentence):
+        if not self.dense:
+            return self.embedder.cosine_similarity(sentence1, sentence2)
+        return super().cosine_similarity(sentence1, sentence2)
+
+    def similarity_matrix(self, sentences: List[Sentence], others: List[Sentence] = None):
+        if not self.dense:
+            return self.embedder.similarity_matrix(sentences, others)
+        return super().similarity_matrix(sentences, others)
+
+    def similarity_blocks(self, sentences: List[Sentence], block_size: int):
+        if not self.dense:
+            return self.embedder.similarity_blocks(sentences, block_size)
+        return super().similarity_blocks(sentences, block_size)
+
+    @classmethod
+    def from_embedding_config(cls, config: Dict, nlp: Language, sentences: Iterable[Union[str, Sentence]]):
+        """Creates the embedder named by the config, wrapped in a cache.
+
+        :param config: the embedder config, with `cache` set
+        :param nlp: the SpaCy language model
+        :param sentences: the sentences to be embedded
+        """
+        embedder_config = {key: value for key, value in config.items() if key not in CachingEmbedder.CACHE_CONFIG_KEYS}
+        embedder = Embedder.from_config(embedder_config, nlp, sentences)
+        fingerprint = "{0}|{1}".format(embedder.fingerprint(), json.dumps(embedder_config, sort_keys=True))
+
+        cache_path = config.get(CachingEmbedder.CACHE_PATH_CONFIG_KEY) or CachingEmbedder.DEFAULT_CACHE_PATH
+        max_bytes = int(float(config.get(CachingEmbedder.CACHE_SIZE_CONFIG_KEY) or CachingEmbedder.DEFAULT_CACHE_SIZE_MB) * 2 ** 20)
+        memory_size = int(config.get(CachingEmbedder.CACHE_MEMORY_SIZE_CONFIG_KEY) or CachingEmbedder.DEFAULT_MEMORY_SIZE)
+        return cls(embedder, fingerprint, cache_path, max_bytes, memory_size)
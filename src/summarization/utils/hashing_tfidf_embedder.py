@@ -0,0 +1,45 @@
+from typing import Dict, Iterable, List, Union
+
+from spacy.language import Language
+
+from .embedder import Embedder
+from .idf_model import IdfModel
+from .sentence import Sentence
+from .tfidf_embedder import TfidfEmbedder
+
+
+@Embedder.register_strategy
+class HashingTfidfEmbedder(TfidfEmbedder):
+    """A tf-idf embedder whose idf weights were fit once over a whole collection (see `IdfModel`), rather than on
+    the sentences of each topic. Terms are hashed, so there is no vocabulary to fit or hold in memory, and embedding
+    a topic's sentences is a pure transform.
+    """
+
+    name = "hashing_tfidf"
+
+    IDF_MODEL_CONFIG_KEY = "idf_model"
+
+    def __init__(self, nlp, sentences: Iterable[Union[str, Sentence]], idf_model: IdfModel,
+                 batch_size: int = TfidfEmbedder.DEFAULT_BATCH_SIZE, dtype=Embedder.DEFAULT_DTYPE):
+        """
+        :param nlp: the SpaCy language model
+        :param sentences: the sentences to be embedded
+        :param idf_model: the idf weights of the hashed terms
+        :param batch_size: the number of raw sentences to tokenize at a time
+        :param dtype: the float type of the embeddings and similarities
+        """
+        self.idf_model = idf_model
+        super().__init__(nlp, sentences, batch_size, dtype)
+
+    def create_vectorizer(self):
+        """Overriding TfidfEmbedder's `create_vectorizer` to transform sentences with the fixed idf weights."""
+        return self.idf_model
+
+    @classmethod
+    def from_embedding_config(cls, config: Dict, nlp: Language, sentences: List[Union[str, Sentence]]):
+        idf_model_path = config.get(HashingTfidfEmbedder.IDF_MODEL_CONFIG_KEY)
+        if not idf_model_path:
+            raise ValueError("No embedding config entry for '{0}'".format(HashingTfidfEmbedder.IDF_MODEL_CONFIG_KEY))
+        batch_size = int(config.get(TfidfEmbedder.BATCH_SIZE_CONFIG_KEY) or TfidfEmbedder.DEFAULT_BATCH_SIZE)
+        dtype, _ = Embedder.precision_from_config(config)
+        return cls(nlp, sentences, IdfModel.open(idf_model_path), batch_size, dtype)
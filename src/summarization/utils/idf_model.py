@@ -0,0 +1,145 @@
+import argparse
+import glob
+import logging
+import os
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class IdfModel(object):
+    """Inverse document frequencies of hashed terms, fit once over a whole collection.
+
+    Terms are hashed into a fixed number of features instead of being kept in a vocabulary, so the model is just
+    two numbers and an array of document frequencies, fit in a single streaming pass over the documents. The idf
+    weights are smoothed exactly as sklearn's `TfidfVectorizer` smooths them.
+    """
+
+    DEFAULT_N_FEATURES = 2 ** 20
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, document_frequencies: np.array, document_count: int):
+        """
+        :param document_frequencies: the number of documents each hashed term occurs in
+        :param document_count: the number of documents the model was fit on
+        """
+        self.document_frequencies = document_frequencies
+        self.document_count = document_count
+        self.idf = np.log((1 + document_count) / (1 + document_frequencies)) + 1
+
+    @property
+    def n_features(self) -> int:
+        return len(self.document_frequencies)
+
+    @staticmethod
+    def hashing_vectorizer(n_features: int) -> HashingVectorizer:
+        """The vectorizer which hashes the term counts of texts, tokenizing them as `TfidfVectorizer` would."""
+        return HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+
+    @classmethod
+    def fit(cls, texts: Iterable[str], n_features: int = DEFAULT_N_FEATURES,
+            batch_size: int = DEFAULT_BATCH_SIZE) -> "IdfModel":
+        """Counts the document frequency of every hashed term in one pass, holding one batch of texts at a time.
+
+        :param texts: the normalized text of each document
+        :param n_features: the number of features terms are hashed into
+        :param batch_size: the number of documents to hash at a time
+        """
+        vectorizer = IdfModel.hashing_vectorizer(n_features)
+        document_frequencies = np.zeros((n_features, ), dtype=np.int64)
+        document_count = 0
+        texts = iter(texts)
+        for batch in iter(lambda: list(islice(texts, batch_size)), []):
+            counts = vectorizer.transform(batch)
+            counts.sum_duplicates()
+            document_frequencies += np.bincount(counts.indices, minlength=n_features)
+            document_count += len(batch)
+        return cls(document_frequencies, document_count)
+
+    def transform(self, texts: List[str]) -> csr_matrix:
+        """Computes the l2-normalized tf-idf rows of texts. Nothing is fit, so a text's row doesn't depend on the
+        texts it is transformed with.
+
+        :param texts: the normalized texts
+        :return: a |texts|×n_features CSR matrix
+        """
+        counts = IdfModel.hashing_vectorizer(self.n_features).transform(texts)
+        return normalize(counts.multiply(self.idf).tocsr())
+
+    def fit_transform(self, texts: Iterable[str]) -> csr_matrix:
+        """Matches `TfidfVectorizer`, but the idf weights are fixed, so this is just `transform`."""
+        return self.transform(list(texts))
+
+    def save(self, path: str):
+        """Saves the model as a (compressed) numpy archive."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "wb") as outfile:
+            np.savez_compressed(outfile, document_frequencies=self.document_frequencies,
+                                document_count=self.document_count)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def open(path: str) -> "IdfModel":
+        """Loads a model once per process, however many embedders use it."""
+        with np.load(path) as model:
+            return IdfModel(model["document_frequencies"], int(model["document_count"]))
+
+
+def collection_texts(aquaint_path: str = None, aquaint2_path: str = None, text_path: str = None) -> Iterator[str]:
+    """Streams the body text of every document of the collections, file by file.
+
+    :param aquaint_path: the AQUAINT directory, with daily files under <source>/<year>/
+    :param aquaint2_path: the AQUAINT-2 directory, with monthly xml files under data/<source>/
+    :param text_path: a directory of plain text files, each of which is a document
+    """
+    # Imported here so that the embedders don't depend on the corpus package
+    from corpus.annotation import body_text
+    from corpus.readers import read_aquaint_stories, read_aquaint2_stories
+
+    if aquaint_path:
+        for path in sorted(glob.glob(os.path.join(aquaint_path, "*", "[0-9]" * 4, "*"))):
+            yield from map(body_text, read_aquaint_stories(path))
+    if aquaint2_path:
+        for path in sorted(glob.glob(os.path.join(aquaint2_path, "data", "*", "*.xml"))):
+            yield from map(body_text, read_aquaint2_stories(path))
+    if text_path:
+        for path in sorted(glob.glob(os.path.join(text_path, "**", "*"), recursive=True)):
+            if os.path.isfile(path):
+                with open(path, encoding="utf-8", errors="replace") as infile:
+                    yield ' '.join(infile.read().split())
+
+
+def normalized_texts(nlp, texts: Iterable[str], batch_size: int = IdfModel.DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    """Tokenizes and normalizes texts exactly as the tf-idf embedders normalize sentences."""
+    from .tfidf_embedder import normalize_tokens
+
+    for doc in nlp.tokenizer.pipe(texts, batch_size=batch_size):
+        yield normalize_tokens(token.text for token in doc)
+
+
+if __name__ == "__main__":
+    from .pipeline import load_pipeline
+
+    p = argparse.ArgumentParser(description="Fits the idf weights of the hashing tf-idf embedder over whole "
+                                            "document collections in one streaming pass.")
+    p.add_argument('path', help='the file to save the model to')
+    p.add_argument('--aquaint', help='the AQUAINT directory')
+    p.add_argument('--aquaint2', help='the AQUAINT-2 directory')
+    p.add_argument('--text', help='a directory of plain text documents')
+    p.add_argument('--spacy-model', default="blank:en", help='the SpaCy pipeline whose tokenizer to use')
+    p.add_argument('--n-features', type=int, default=IdfModel.DEFAULT_N_FEATURES,
+                   help='the number of features terms are hashed into')
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    nlp = load_pipeline(args.spacy_model)
+    model = IdfModel.fit(normalized_texts(nlp, collection_texts(args.aquaint, args.aquaint2, args.text)),
+                         args.n_features)
+    model.save(args.path)
+    logging.info("Fit idf weights over {0} documents".format(model.document_count))
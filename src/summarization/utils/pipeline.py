@@ -0,0 +1,23 @@
+import spacy
+from spacy.language import Language
+
+DEFAULT_PIPELINE = "en_vectors_web_lg"
+
+BLANK_PREFIX = "blank:"
+
+
+def load_pipeline(name: str = DEFAULT_PIPELINE) -> Language:
+    """Loads a SpaCy pipeline that can split text into sentences.
+
+    :param name: the name of an installed SpaCy model, or `blank:<lang>` (e.g., `blank:en`)
+                 for a tokenizer-only pipeline
+    :return: the SpaCy language object
+    """
+    nlp = spacy.blank(name[len(BLANK_PREFIX):]) if name.startswith(BLANK_PREFIX) else spacy.load(name)
+    if "sentencizer" not in nlp.pipe_names:
+        try:
+            nlp.add_pipe(nlp.create_pipe("sentencizer"))
+        except ValueError:
+            # SpaCy 3 adds pipeline components by name
+            nlp.add_pipe("sentencizer")
+    return nlp
@@ -1,29 +1,172 @@
 
+from collections import namedtuple
 from datetime import date
+from typing import Iterable, List, Tuple, Union
 
 import numpy as np
 from spacy.tokens.span import Span as SpacySent
 
+class SentenceRecord(namedtuple("SentenceRecord", ("text", "tokens", "vector", "word_count"))):
+    """The compact annotations of a sentence: its text, its token strings, its SpaCy vector and its word count
+    (the number of entirely alphanumeric tokens).
+
+    Unlike a SpaCy span, a record doesn't keep its whole document alive and is cheap to send between processes.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_span(cls, sent: SpacySent):
+        tokens = tuple(token.text for token in sent)
+        return cls(sent.text, tokens, sent.vector, len(list(filter(str.isalnum, tokens))))
+
+
+class SentenceStore(object):
+    """Columnar storage for the sentences of a topic.
+
+    Rather than one object per sentence (each keeping its SpaCy document alive), a topic's sentences are
+    kept in a handful of arrays: the document and position of each sentence, its timestamp and word count,
+    the offsets of its text and tokens in a single text buffer, and a matrix of sentence vectors.
+    `Sentence`s are lightweight views of a row.
+    """
+
+    def __init__(self, doc_ids: List[str], doc_timestamps: List[date], doc_index: np.array, sent_index: np.array,
+                 word_counts: np.array, text: str, text_offsets: np.array, token_starts: np.array,
+                 token_ends: np.array, token_offsets: np.array, embeddings: np.array):
+        """
+        :param doc_ids: the id of each document
+        :param doc_timestamps: the timestamp of each document
+        :param doc_index: the index (in `doc_ids`) of each sentence's document
+        :param sent_index: the position of each sentence in its document
+        :param word_counts: the number of entirely alphanumeric tokens in each sentence
+        :param text: the text of every sentence, concatenated
+        :param text_offsets: sentence i is `text[text_offsets[i]:text_offsets[i + 1]]`
+        :param token_starts: the start of each token in `text`
+        :param token_ends: the end of each token in `text`
+        :param token_offsets: sentence i's tokens are `token_offsets[i]` up to `token_offsets[i + 1]`
+        :param embeddings: a matrix with a SpaCy vector for each sentence
+        """
+        self.doc_ids = doc_ids
+        self.doc_timestamps = doc_timestamps
+        self.doc_index = doc_index
+        self.sent_index = sent_index
+        self.word_counts = word_counts
+        self.text = text
+        self.text_offsets = text_offsets
+        self.token_starts = token_starts
+        self.token_ends = token_ends
+        self.token_offsets = token_offsets
+        self.embeddings = embeddings
+        self.timestamps = np.array([np.datetime64(doc_timestamps[i]) if doc_timestamps[i] else np.datetime64('NaT')
+                                    for i in doc_index], dtype='datetime64[us]')
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, date, int, SentenceRecord]]):
+        """Builds a store from (document id, document timestamp, sentence index, sentence record) rows."""
+        doc_ids, doc_timestamps, doc_positions = [], [], dict()
+        doc_index, sent_index, word_counts, vectors = [], [], [], []
+        texts, text_offsets = [], [0]
+        token_starts, token_ends, token_offsets = [], [], [0]
+        for doc_id, doc_timestamp, sent_number, record in rows:
+            if doc_id not in doc_positions:
+                doc_positions[doc_id] = len(doc_ids)
+                doc_ids.append(doc_id)
+                doc_timestamps.append(doc_timestamp)
+            doc_index.append(doc_positions[doc_id])
+            sent_index.append(sent_number)
+            word_counts.append(record.word_count)
+            vectors.append(record.vector)
+
+            # Tokens are non-destructive substrings of the sentence, so they can be stored as offsets
+            start, position = text_offsets[-1], 0
+            for token in record.tokens:
+                position = record.text.find(token, position)
+                token_starts.append(start + position)
+                position += len(token)
+                token_ends.append(start + position)
+            token_offsets.append(len(token_starts))
+            texts.append(record.text)
+            text_offsets.append(start + len(record.text))
+
+        width = len(vectors[0]) if vectors else 0
+        return cls(doc_ids, doc_timestamps, np.array(doc_index, dtype=np.int32), np.array(sent_index, dtype=np.int32),
+                   np.array(word_counts, dtype=np.int32), ''.join(texts), np.array(text_offsets, dtype=np.int64),
+                   np.array(token_starts, dtype=np.int64), np.array(token_ends, dtype=np.int64),
+                   np.array(token_offsets, dtype=np.int64),
+                   np.array(vectors, dtype=np.float32).reshape(len(vectors), width))
+
+    def __len__(self):
+        return len(self.doc_index)
+
+    def sentence_text(self, row: int) -> str:
+        return self.text[self.text_offsets[row]:self.text_offsets[row + 1]]
+
+    def sentence_tokens(self, row: int) -> Tuple[str]:
+        tokens = slice(self.token_offsets[row], self.token_offsets[row + 1])
+        return tuple(self.text[start:end] for start, end in zip(self.token_starts[tokens], self.token_ends[tokens]))
+
+    def sentences(self) -> List["Sentence"]:
+        """Gets a view of every sentence in the store, in order."""
+        return [Sentence.view(self, row) for row in range(len(self))]
+
+
 class Sentence(object):
-    def __init__(self, doc_id: str, doc_timestamp: date, sent: SpacySent, sent_number: int, embedding: np.array=None):
+    """A sentence of a topic: a lightweight view of one row of a `SentenceStore`."""
+
+    __slots__ = ("_store", "_row", "embedding")
 
-        self._sent = sent
-        self.text = sent.text
-        self.document_id = doc_id
-        self.doc_timestamp = doc_timestamp
-        self.sent_index = sent_number
+    def __init__(self, doc_id: str, doc_timestamp: date, sent: Union[SpacySent, SentenceRecord], sent_number: int, embedding: np.array=None):
+        """Creates a stand-alone sentence, backed by a store of its own.
+
+        :param sent: a SpaCy sentence span, or a `SentenceRecord` of its annotations
+        """
+        if not isinstance(sent, SentenceRecord):
+            sent = SentenceRecord.from_span(sent)
+        self._store = SentenceStore.build([(doc_id, doc_timestamp, sent_number, sent)])
+        self._row = 0
         self.embedding = embedding
 
+    @classmethod
+    def view(cls, store: SentenceStore, row: int):
+        """Creates a view of the sentence in a row of a store."""
+        sentence = cls.__new__(cls)
+        sentence._store = store
+        sentence._row = row
+        sentence.embedding = None
+        return sentence
+
+    def __eq__(self, other):
+        return isinstance(other, Sentence) and self._store is other._store and self._row == other._row
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
     def __len__(self):
         """returns word count in sentence, does not count tokens unless entirely alphanumeric"""
-        return len(list(filter(str.isalnum, [token.text for token in self.tokens()])))
+        return int(self._store.word_counts[self._row])
+
+    @property
+    def text(self):
+        return self._store.sentence_text(self._row)
+
+    @property
+    def document_id(self):
+        return self._store.doc_ids[self._store.doc_index[self._row]]
+
+    @property
+    def doc_timestamp(self):
+        return self._store.doc_timestamps[self._store.doc_index[self._row]]
+
+    @property
+    def sent_index(self):
+        return int(self._store.sent_index[self._row])
+
+    @property
+    def word_count(self):
+        return len(self)
 
     def doc_id(self):
         return self.document_id
 
-    def text(self):
-        return self.text
-
     def get_timestamp(self):
         return self.doc_timestamp
 
@@ -31,5 +174,8 @@ class Sentence(object):
         return self.sent_index
 
     def tokens(self):
-        return self._sent
+        return self._store.sentence_tokens(self._row)
 
+    @property
+    def vector(self):
+        return self._store.embeddings[self._row]
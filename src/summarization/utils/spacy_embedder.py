@@ -2,6 +2,7 @@ from typing import Dict, List
 
 from .embedder import Embedder
 from .sentence import Sentence
+from .vector_table import VectorTable
 
 import numpy as np
 from spacy.language import Language
@@ -11,8 +12,31 @@ class SpacyEmbedder(Embedder):
 
     name = "spacy"
 
-    def __init__(self, nlp: Language):
-        super().__init__(nlp)
+    VECTOR_TABLE_CONFIG_KEY = "vector_table"
+
+    def __init__(self, nlp: Language, vector_table: VectorTable = None, dtype=Embedder.DEFAULT_DTYPE,
+                 quantize: bool = False):
+        """
+        :param nlp: the SpaCy language model
+        :param vector_table: optionally, a memory-mapped table to average the word vectors from, rather than
+        the vectors of the SpaCy model
+        :param dtype: the float type of the embeddings and similarities
+        :param quantize: whether to compute similarities from int8-quantized embeddings
+        """
+        super().__init__(nlp, dtype, quantize)
+        self.vector_table = vector_table
+
+    def fingerprint(self) -> str:
+        if self.vector_table is None:
+            return super().fingerprint()
+        return "{0}|{1}".format(self.name, self.vector_table.path)
+
+    def __vectors(self, sentences: List[Sentence]) -> np.array:
+        if self.vector_table is None:
+            vectors = np.vstack([sentence.vector for sentence in sentences])
+        else:
+            vectors = self.vector_table.sentence_vectors([sentence.tokens() for sentence in sentences])
+        return vectors.astype(self.dtype, copy=False)
 
     def embed(self, sentence: Sentence) -> np.array:
         """Returns the GLoVe vector of a sentence's tokens.
@@ -20,16 +44,24 @@ class SpacyEmbedder(Embedder):
         :param sentence: the sentence to be embedded
         :return: the GLoVe vector
         """
-        return sentence.tokens().vector.reshape(1, -1)
+        return self.__vectors([sentence])
+
+    def embed_many(self, sentences: List[Sentence]) -> np.array:
+        """Overriding Embedder's `embed_many` to stack the sentence vectors directly. The similarity methods of
+        `Embedder` go through it.
+        """
+        return self.__vectors(sentences)
 
     @classmethod
     def from_embedding_config(cls, config: Dict, nlp: Language, sentences: List[str]):
         """Creates a SpaCy embedder with the language object. Sentences are
         not needed globally for embedding, so they are ignored.
 
-        :param config: the config to optionally use
+        :param config: the config to optionally use, with the path of a vector table under `vector_table`
         :param nlp: the SpaCy language model
         :param sentences: a list of raw strings
         :return:
         """
-        return cls(nlp)
\ No newline at end of file
+        vector_table_path = config.get(SpacyEmbedder.VECTOR_TABLE_CONFIG_KEY)
+        vector_table = VectorTable.open(vector_table_path) if vector_table_path is not None else None
+        return cls(nlp, vector_table, *Embedder.precision_from_config(config))
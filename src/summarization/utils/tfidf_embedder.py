@@ -1,50 +1,132 @@
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
 
 import numpy as np
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
 from spacy.language import Language
 
 from .embedder import Embedder
 from .sentence import Sentence
 
+STEM_CACHE_SIZE = 2 ** 18
+
+_porter_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(token: str) -> str:
+    """Stems a token with the Porter stemmer. Stems are memoized for the lifetime of the process, so they are
+    shared by every topic's embedder; a topic's vocabulary is mostly the same words over and over again.
+    """
+    return _porter_stemmer.stem(token)
+
+
+@lru_cache(maxsize=None)
+def english_stopwords() -> frozenset:
+    """The NLTK English stopwords, read from disk only once."""
+    return frozenset(stopwords.words('english'))
+
+
+def normalize_tokens(tokens: Iterable[str]) -> str:
+    """Normalizes a tokenized sentence (or document) for tf-idf: drops stopwords and stems the rest.
+
+    :param tokens: the token strings
+    :return: the normalized text
+    """
+    stops = english_stopwords()
+    # Join naively -- doesn't matter if this is done correctly as long as this is consistent
+    return ' '.join(stem(token) for token in tokens if token not in stops)
+
 
 @Embedder.register_strategy
 class TfidfEmbedder(Embedder):
 
     name = "tfidf"
+    dense = False
+
+    BATCH_SIZE_CONFIG_KEY = "batch_size"
+    DEFAULT_BATCH_SIZE = 1000
 
-    def __init__(self, nlp, sentences):
-        super().__init__(nlp)
+    def __init__(self, nlp, sentences: Iterable[Union[str, Sentence]], batch_size: int = DEFAULT_BATCH_SIZE,
+                 dtype=Embedder.DEFAULT_DTYPE):
+        super().__init__(nlp, dtype)
 
-        self.stopwords = frozenset(stopwords.words('english'))
-        self.stemmer = PorterStemmer()
+        self.stopwords = english_stopwords()
+        self.batch_size = batch_size
 
         # Cache the preprocessed sentence since calling it is expensive.
-        self.sent2processed_sent = { sentence: self.preprocess_sentence(sentence) for sentence in sentences }
+        sentences = list(sentences)
+        texts = (sentence if isinstance(sentence, str) else sentence.text for sentence in sentences)
+        self.sent2processed_sent = dict(zip(texts, map(self.preprocess_tokens, self.tokenize(sentences))))
 
         # Map the preprocessed sentence to its location in the tfidf matrix.
         self.sent_to_index = {s: i for i, s in enumerate(self.sent2processed_sent.values())}
-        self.tfidf_matrix = TfidfVectorizer().fit_transform(self.sent2processed_sent.values())
+        self.vectorizer = self.create_vectorizer()
+        self.tfidf_matrix = self.vectorizer.fit_transform(self.sent2processed_sent.values()).astype(dtype, copy=False)
 
-        # Compute the similarity matrix for every sentence
-        self.sims = (self.tfidf_matrix * self.tfidf_matrix.T).toarray()
+        self.__sims = None
+
+    def create_vectorizer(self):
+        """Creates the vectorizer which is fit on the sentences, and then transforms new ones."""
+        return TfidfVectorizer(dtype=self.dtype)
+
+    def add_sentences(self, sentences: Iterable[Union[str, Sentence]]):
+        """Overriding Embedder's `add_sentences` to give new sentences rows in the tf-idf matrix. The vocabulary and
+        idf weights stay those fit on the original sentences, so only the new sentences are processed.
+        """
+        sentences = [sentence for sentence in sentences
+                     if (sentence if isinstance(sentence, str) else sentence.text) not in self.sent2processed_sent]
+        texts = (sentence if isinstance(sentence, str) else sentence.text for sentence in sentences)
+        processed_sents = dict(zip(texts, map(self.preprocess_tokens, self.tokenize(sentences))))
+        self.sent2processed_sent.update(processed_sents)
+
+        new_processed_sents = [s for s in dict.fromkeys(processed_sents.values()) if s not in self.sent_to_index]
+        if new_processed_sents:
+            self.sent_to_index.update((s, i) for i, s in enumerate(new_processed_sents, self.tfidf_matrix.shape[0]))
+            new_rows = self.vectorizer.transform(new_processed_sents).astype(self.dtype, copy=False)
+            self.tfidf_matrix = vstack((self.tfidf_matrix, new_rows)).tocsr()
+            self.__sims = None
+
+    @property
+    def sims(self):
+        """The similarity matrix for every sentence. The rows of the tf-idf matrix are l2-normalized, so this is
+        cosine similarity, and most pairs share no terms, so it is kept sparse. It is only computed when needed,
+        since `similarity_blocks` doesn't need it.
+        """
+        if self.__sims is None:
+            self.__sims = (self.tfidf_matrix * self.tfidf_matrix.T).tocsr()
+        return self.__sims
+
+    def tokenize(self, sentences: List[Union[str, Sentence]]) -> Iterable[Iterable[str]]:
+        """Gets the tokens of each sentence. The tokens a `Sentence` got when the corpus was read are reused;
+        raw strings are run through the tokenizer alone (none of the rest of the pipeline), in batches.
+
+        :param sentences: a list of raw strings or `Sentence`s
+        :return: an iterable of token strings for each sentence, in order
+        """
+        raw_sentences = [sentence for sentence in sentences if isinstance(sentence, str)]
+        docs = iter(self.nlp.tokenizer.pipe(raw_sentences, batch_size=self.batch_size) if raw_sentences else [])
+        for sentence in sentences:
+            yield [token.text for token in next(docs)] if isinstance(sentence, str) else sentence.tokens()
 
     def preprocess_sentence(self, sentence: str):
         """A method to normalize a string sentence.
 
-        Note: this is expensive, so it should not be called often.
-
         :param sentence: the sentence to be preprocessed
         :return: a normalized sentence
         """
-        # Get tokens without stopwords
-        tokens = (token.text for token in self.nlp(sentence) if token.text not in self.stopwords)
-        # Stem
-        stemmed_tokens = map(self.stemmer.stem, tokens)
-        # Join naively -- doesn't matter if this is done correctly as long as this is consistent
-        return ' '.join(stemmed_tokens)
+        return self.preprocess_tokens(token.text for token in self.nlp.make_doc(sentence))
+
+    def preprocess_tokens(self, tokens: Iterable[str]):
+        """Normalizes a tokenized sentence.
+
+        :param tokens: the token strings of the sentence
+        :return: a normalized sentence
+        """
+        return normalize_tokens(tokens)
 
     def embed(self, sentence: Sentence) -> np.array:
         """Pull out the tf-idf of a sentence from its matrix.
@@ -58,14 +140,40 @@ class TfidfEmbedder(Embedder):
         # Pull out the weights from the tf-idf matrix
         return self.tfidf_matrix[sent_number, feature_index]
 
+    def embed_many(self, sentences: List[Sentence]) -> csr_matrix:
+        """Overriding Embedder's `embed_many` to pull the sentences' full rows out of the tf-idf matrix."""
+        return self.tfidf_matrix[self.__rows(sentences)]
+
     def cosine_similarity(self, sentence1: Sentence, sentence2: Sentence):
         """Overriding Embedder's `cosine_similarity`
         """
         preprocessed_sent1 = self.sent2processed_sent[sentence1.text]
         preprocessed_sent2 = self.sent2processed_sent[sentence2.text]
         # Pull out the similarity for sentence 1 and sentence 2
-        return self.sims[self.sent_to_index[preprocessed_sent1]][self.sent_to_index[preprocessed_sent2]]
+        return self.sims[self.sent_to_index[preprocessed_sent1], self.sent_to_index[preprocessed_sent2]]
+
+    def similarity_matrix(self, sentences: List[Sentence], others: List[Sentence] = None):
+        """Overriding Embedder's `similarity_matrix` to pull the sentences' rows and columns out of the
+        precomputed sparse similarity matrix, or to multiply just their tf-idf rows when comparing them to others.
+        """
+        rows = self.__rows(sentences)
+        if others is None:
+            return self.sims[rows][:, rows]
+        return (self.tfidf_matrix[rows] * self.tfidf_matrix[self.__rows(others)].T).tocsr()
+
+    def similarity_blocks(self, sentences: List[Sentence], block_size: int) -> Iterator[Tuple[int, csr_matrix]]:
+        """Overriding Embedder's `similarity_blocks` to multiply a block of the sentences' tf-idf rows at a time."""
+        tfidf_matrix = self.tfidf_matrix[self.__rows(sentences)]
+        for start in range(0, len(sentences), block_size):
+            yield start, (tfidf_matrix[start:start + block_size] * tfidf_matrix.T).tocsr()
+
+    def __rows(self, sentences: List[Sentence]) -> np.array:
+        """Finds the row of each sentence in the tf-idf matrix."""
+        return np.array([self.sent_to_index[self.sent2processed_sent[sentence.text]] for sentence in sentences],
+                        dtype=np.int64)
 
     @classmethod
-    def from_embedding_config(cls, config: Dict, nlp: Language, sentences: List[str]):
-        return cls(nlp, sentences)
+    def from_embedding_config(cls, config: Dict, nlp: Language, sentences: List[Union[str, Sentence]]):
+        batch_size = int(config.get(TfidfEmbedder.BATCH_SIZE_CONFIG_KEY) or TfidfEmbedder.DEFAULT_BATCH_SIZE)
+        dtype, _ = Embedder.precision_from_config(config)
+        return cls(nlp, sentences, batch_size, dtype)
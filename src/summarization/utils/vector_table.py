@@ -0,0 +1,106 @@
+import argparse
+import os
+from functools import lru_cache
+from typing import Iterable, List
+
+import numpy as np
+from spacy.language import Language
+
+
+class VectorTable(object):
+    """A read-only table of word vectors, memory-mapped from disk.
+
+    A table is a directory holding `vectors.npy`, a float32 matrix with one vector per row, and `keys.txt`, which
+    maps each word to its row (one tab-separated word and row per line). Opening one only reads the keys; the
+    vectors are paged in as they are used, and processes opening the same table share its pages. This avoids
+    loading a large SpaCy vectors model into every process just to average a few word vectors.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    KEYS_FILE = "keys.txt"
+
+    def __init__(self, path: str):
+        """
+        :param path: the directory of the table
+        """
+        self.path = path
+        self.vectors = np.load(os.path.join(path, VectorTable.VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, VectorTable.KEYS_FILE), encoding="utf-8") as infile:
+            self.key2row = {word: int(row) for word, row in (line.rstrip("\n").rsplit("\t", 1) for line in infile)}
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def open(path: str) -> "VectorTable":
+        """Opens a table once per process, however many embedders use it."""
+        return VectorTable(path)
+
+    @property
+    def width(self) -> int:
+        return self.vectors.shape[1]
+
+    def sentence_vector(self, tokens: Iterable[str]) -> np.array:
+        """Averages the vectors of a sentence's tokens. Like SpaCy, tokens without a vector count as zeros.
+
+        :param tokens: the token strings of the sentence
+        :return: the average vector
+        """
+        tokens = list(tokens)
+        if not tokens:
+            return np.zeros((self.width, ), dtype=np.float32)
+        rows = [self.key2row[token] for token in tokens if token in self.key2row]
+        return np.asarray(self.vectors[sorted(rows)].sum(axis=0) / len(tokens), dtype=np.float32)
+
+    def sentence_vectors(self, sentences: List[Iterable[str]]) -> np.array:
+        """Averages the vectors of the tokens of several sentences.
+
+        :param sentences: the token strings of each sentence
+        :return: a matrix with one average vector per sentence
+        """
+        matrix = np.zeros((len(sentences), self.width), dtype=np.float32)
+        for i, tokens in enumerate(sentences):
+            matrix[i] = self.sentence_vector(tokens)
+        return matrix
+
+    @staticmethod
+    def write(path: str, words: List[str], rows: List[int], vectors: np.array):
+        """Writes a table.
+
+        :param path: the directory to write the table to
+        :param words: the words of the table
+        :param rows: the row of each word in `vectors`
+        :param vectors: the vectors
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, VectorTable.VECTORS_FILE + ".tmp"), "wb") as outfile:
+            np.save(outfile, np.asarray(vectors, dtype=np.float32))
+        with open(os.path.join(path, VectorTable.KEYS_FILE + ".tmp"), "w", encoding="utf-8") as outfile:
+            for word, row in zip(words, rows):
+                if "\n" not in word:
+                    outfile.write("{0}\t{1}\n".format(word, row))
+        os.replace(os.path.join(path, VectorTable.VECTORS_FILE + ".tmp"), os.path.join(path, VectorTable.VECTORS_FILE))
+        os.replace(os.path.join(path, VectorTable.KEYS_FILE + ".tmp"), os.path.join(path, VectorTable.KEYS_FILE))
+
+    @staticmethod
+    def build(nlp: Language, path: str):
+        """Writes the vectors of a SpaCy model as a table.
+
+        :param nlp: a SpaCy language object with vectors
+        :param path: the directory to write the table to
+        """
+        vectors = nlp.vocab.vectors
+        words, rows = [], []
+        for key, row in vectors.key2row.items():
+            words.append(nlp.vocab.strings[key])
+            rows.append(row)
+        VectorTable.write(path, words, rows, vectors.data)
+
+
+if __name__ == "__main__":
+    import spacy
+
+    p = argparse.ArgumentParser(description="Builds a memory-mapped vector table from the vectors of a SpaCy model.")
+    p.add_argument('model', help='the name of the SpaCy model, e.g. en_vectors_web_lg')
+    p.add_argument('path', help='the directory to write the table to')
+    args = p.parse_args()
+
+    VectorTable.build(spacy.load(args.model), args.path)
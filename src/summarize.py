@@ -1,11 +1,9 @@
 #!/usr/bin/env python3
 
-import spacy
-
 import yaml
 
 from summarization.strategy import SummarizationStrategy, LexRankSummarizationStrategy
-from summarization.utils import Embedder, SpacyEmbedder, TfidfEmbedder
+from summarization.utils import Embedder, SpacyEmbedder, TfidfEmbedder, DEFAULT_PIPELINE, load_pipeline
 from summarization.information_ordering import InformationOrderer, ChronologicalExpert
 from summarization import Summarizer
 
@@ -19,14 +17,27 @@ def setup_argparse():
                    help='a yaml config mapping the topic clustering to file locations')
     p.add_argument('-d', dest='output_dir', default='../outputs/D4/', help='dir to write output summaries to')
     p.add_argument('-m', dest='model_path', default='', help='path for a pre-trained embedding model')
+    p.add_argument('-w', dest='workers', type=int, default=None,
+                   help='number of processes to preprocess the corpus with (overrides the config\'s workers)')
+    p.add_argument('-s', dest='streaming', action='store_true',
+                   help='preprocess each topic only when it is summarized, freeing it afterwards')
+    p.add_argument('-u', dest='update', action='store_true',
+                   help='also write update summaries of each topic\'s docsetB')
     return p.parse_args()
 
-def make_filename(topic_id, num_words):
+def make_filename(topic_id, num_words, docset='A'):
     """Given topic id and max num words, return filename for storing summary
     :param topic_id: A string representing the unique topic id
-    :param num_words: A maximum number of words for the summary length"""
+    :param num_words: A maximum number of words for the summary length
+    :param docset: 'A' for the summary of the topic's docset, 'B' for the update summary"""
     some_unique_alphanum = 4  # this is our groupnumber for identification
-    return '{0}-A.M.{2}.{1}.{3}'.format(topic_id[:-1], topic_id[-1], num_words, some_unique_alphanum)
+    return '{0}-{4}.M.{2}.{1}.{3}'.format(topic_id[:-1], topic_id[-1], num_words, some_unique_alphanum, docset)
+
+def write_summary(path, summary):
+    with open(path, 'w') as outfile:
+        for sentence in summary:
+            outfile.write('{}\n'.format(sentence.text))
+        outfile.write('\n')  # write blank file if no candidates
 
 def setup_information_orderer():
 
@@ -44,14 +55,13 @@ if __name__ == "__main__":
 
     args = setup_argparse()
 
-    nlp = spacy.load('en_vectors_web_lg')
-    nlp.add_pipe(nlp.create_pipe('sentencizer'))
-
     print("Reading config...")
     config = read_yaml_config(args.config_file)
 
+    nlp = load_pipeline(config.get('spacyModel') or DEFAULT_PIPELINE)
+
     print("Reading corpus...")
-    corpus = Corpus.from_config(config, nlp)
+    corpus = Corpus.from_config(config, nlp, args.workers, args.streaming, args.update)
  
     print("Reading summarizer...")
     summarizer = Summarizer.from_config(config, nlp)
@@ -61,12 +71,16 @@ if __name__ == "__main__":
     
     num_topics = len(corpus.topics)
 
-    for i, topic in enumerate(corpus.topics, 1):
+    for i, topic in enumerate(corpus.iter_topics(), 1):
         candidates = summarizer.summarize(topic)
       
         summary = information_orderer.order_all(candidates)
+        write_summary('{0}{1}'.format(args.output_dir, make_filename(topic.id(), config.get(Summarizer.WORD_LIMIT_KEY))),
+                      summary)
+
+        if corpus.update and topic.update_docset is not None:
+            update_candidates = summarizer.summarize_update(topic)
+            update_summary = information_orderer.order_all(update_candidates)
+            write_summary('{0}{1}'.format(args.output_dir, make_filename(topic.id(), config.get(Summarizer.WORD_LIMIT_KEY), 'B')),
+                          update_summary)
         print("Summarized {0}/{1} topics".format(i, num_topics))
-        with open('{0}{1}'.format(args.output_dir, make_filename(topic.id(), config.get(Summarizer.WORD_LIMIT_KEY))), 'w') as outfile:
-            for sentence in summary:
-                outfile.write('{}\n'.format(sentence.text))
-            outfile.write('\n')  # write blank file if no candidates
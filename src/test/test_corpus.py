@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from corpus import Corpus, load_pipeline
+
+ROOT_PATH = os.path.join(os.path.dirname(__file__), "..", "..")
+
+UPDATE_TOPICS = """<TACtaskdata>
+<topic id = "D1001A">
+    <title> Columbine Massacre </title>
+    <docsetA id = "D1001A-A">
+        <doc id = "APW19990421.0284" />
+        <doc id = "APW19990422.0082" />
+    </docsetA>
+    <docsetB id = "D1001A-B">
+        <doc id = "APW19990427.0078" />
+        <doc id = "APW19990502.0104" />
+    </docsetB>
+</topic>
+</TACtaskdata>
+"""
+
+class CorpusTestCase(TestCase):
+
+    def setUp(self):
+        self.nlp = load_pipeline("blank:en")
+        self.config = {
+            'clusterPath': os.path.join(ROOT_PATH, "conf", "test_topics.xml"),
+            'documentCollections': {
+                'aquaint': os.path.join(ROOT_PATH, "examples", "AQUAINT"),
+            },
+            'spacyModel': "blank:en",
+        }
+
+    @staticmethod
+    def flatten_topic(topic):
+        return [(topic.id(), story.headline, sentence.doc_id(), sentence.get_sent_index(), sentence.text)
+                for story in topic.stories for sentence in story.sentences]
+
+    @classmethod
+    def flatten(cls, corpus):
+        return [row for topic in corpus.topics for row in cls.flatten_topic(topic)]
+
+    def test_corpus_skips_documents_missing_from_the_collection(self):
+        corpus = Corpus.from_config(self.config, self.nlp)
+        topic, = corpus.topics
+        # APW19990428.0297 isn't in the example files
+        self.assertEqual(len(topic.docset) - 1, len(topic.stories))
+
+    def test_corpus_stories_follow_docset_order(self):
+        corpus = Corpus.from_config(self.config, self.nlp)
+        topic, = corpus.topics
+        story_doc_ids = [story.sentences[0].doc_id() for story in topic.stories]
+        self.assertEqual([doc.id() for doc in topic.docset if doc.id() != "APW19990428.0297"], story_doc_ids)
+
+    def test_corpus_is_the_same_with_multiple_workers(self):
+        serial = Corpus.from_config(self.config, self.nlp, workers=1)
+        parallel = Corpus.from_config(self.config, self.nlp, workers=3)
+        self.assertEqual(self.flatten(serial), self.flatten(parallel))
+
+    def test_corpus_loads_annotations_from_the_cache(self):
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+        config = dict(self.config, annotationCachePath=cache_path)
+
+        cold = Corpus.from_config(config, self.nlp)
+        with patch("corpus.corpus.annotate_stories") as annotate_stories:
+            warm = Corpus.from_config(config, self.nlp)
+            annotate_stories.assert_called_once()
+            self.assertEqual([], list(annotate_stories.call_args[0][1]))
+        self.assertEqual(self.flatten(cold), self.flatten(warm))
+        self.assertEqual([s.get_timestamp() for t in cold.topics for story in t.stories for s in story.sentences],
+                         [s.get_timestamp() for t in warm.topics for story in t.stories for s in story.sentences])
+
+    def test_streaming_corpus_preprocesses_topics_lazily(self):
+        eager = Corpus.from_config(self.config, self.nlp)
+        streaming = Corpus.from_config(self.config, self.nlp, streaming=True)
+        topic, = streaming.topics
+        self.assertEqual([], topic.stories)
+
+        streamed = []
+        for streamed_topic in streaming.iter_topics():
+            streamed.append(self.flatten_topic(streamed_topic))
+        self.assertEqual(self.flatten(eager), [row for rows in streamed for row in rows])
+        self.assertEqual([], topic.stories)
+
+    def test_topic_sentences_are_views_of_one_store(self):
+        corpus = Corpus.from_config(self.config, self.nlp)
+        topic, = corpus.topics
+        sentences = [sentence for story in topic.stories for sentence in story.sentences]
+        self.assertEqual(len(topic.sentence_store), len(sentences))
+        for row, sentence in enumerate(sentences):
+            self.assertIs(topic.sentence_store, sentence._store)
+            self.assertEqual(row, sentence._row)
+            self.assertEqual(len(list(filter(str.isalnum, sentence.tokens()))), len(sentence))
+            self.assertTrue(all(token in sentence.text for token in sentence.tokens()))
+
+    def test_update_corpus_reads_update_docsets(self):
+        fd, cluster_path = tempfile.mkstemp(suffix=".xml")
+        self.addCleanup(os.remove, cluster_path)
+        with os.fdopen(fd, "w") as outfile:
+            outfile.write(UPDATE_TOPICS)
+        config = dict(self.config, clusterPath=cluster_path)
+
+        topic, = Corpus.from_config(config, self.nlp).topics
+        self.assertEqual("D1001A-B", topic.update_docset.docset_id)
+        self.assertEqual([], topic.update_stories)
+
+        topic, = Corpus.from_config(config, self.nlp, update=True).topics
+        self.assertEqual(["APW19990421.0284", "APW19990422.0082"],
+                         [story.sentences[0].doc_id() for story in topic.stories])
+        # APW19990502.0104 isn't in the example files
+        self.assertEqual(["APW19990427.0078"], [story.sentences[0].doc_id() for story in topic.update_stories])
+        self.assertIs(topic.sentence_store, topic.update_stories[0].sentences[0]._store)
@@ -1,8 +1,10 @@
 from unittest import TestCase
 
+import numpy as np
 import spacy
 
-from summarization.utils import Embedder, SpacyEmbedder, TfidfEmbedder
+from summarization.utils import Embedder, SpacyEmbedder, TfidfEmbedder, Sentence, SentenceRecord
+from summarization.utils.tfidf_embedder import stem
 
 class EmbedderTestCase(TestCase):
 
@@ -25,4 +27,48 @@ class EmbedderTestCase(TestCase):
         }
 
         embedder = Embedder.from_config(tfidf_embedder_config, self.nlp, sentences)
-        self.assertIsInstance(embedder, TfidfEmbedder)
\ No newline at end of file
+        self.assertIsInstance(embedder, TfidfEmbedder)
+
+    def test_tfidf_embedder_reuses_sentence_tokens(self):
+        raw_sentences = ["The cat sat on the mat.", "The dog sat on the log."]
+        sentences = [Sentence("doc1", None, self.nlp(sentence), i) for i, sentence in enumerate(raw_sentences)]
+        tfidf_embedder_config = {
+            Embedder.CONFIG_EMBED_NAME_KEY: TfidfEmbedder.name,
+        }
+
+        from_strings = Embedder.from_config(tfidf_embedder_config, self.nlp, raw_sentences)
+        from_sentences = Embedder.from_config(tfidf_embedder_config, None, sentences)
+        self.assertEqual(from_strings.sent2processed_sent, from_sentences.sent2processed_sent)
+        self.assertAlmostEqual(from_strings.cosine_similarity(sentences[0], sentences[1]),
+                               from_sentences.cosine_similarity(sentences[0], sentences[1]))
+
+    def test_tfidf_similarity_matrix_matches_pairwise_similarities(self):
+        raw_sentences = ["The cat sat on the mat.", "The dog sat on the log.", "Dogs chase cats."]
+        sentences = [Sentence("doc1", None, self.nlp(sentence), i) for i, sentence in enumerate(raw_sentences)]
+        embedder = TfidfEmbedder(self.nlp, sentences)
+
+        matrix = embedder.similarity_matrix(sentences[::-1]).toarray()
+        for i, sentence1 in enumerate(sentences[::-1]):
+            for j, sentence2 in enumerate(sentences[::-1]):
+                self.assertAlmostEqual(embedder.cosine_similarity(sentence1, sentence2), matrix[i, j])
+
+    def test_spacy_similarity_matrix_matches_pairwise_similarities(self):
+        vectors = [np.array([1.0, 0.0, 1.0]), np.array([0.5, 2.0, 0.0]), np.array([-1.0, 1.0, 3.0])]
+        sentences = [Sentence("doc1", None, SentenceRecord("s", ("s",), vector, 1), i)
+                     for i, vector in enumerate(vectors)]
+        embedder = SpacyEmbedder(self.nlp)
+        for sentence in sentences:
+            sentence.embedding = embedder.embed(sentence)
+
+        matrix = embedder.similarity_matrix(sentences)
+        for i, sentence1 in enumerate(sentences):
+            for j, sentence2 in enumerate(sentences):
+                self.assertAlmostEqual(embedder.cosine_similarity(sentence1, sentence2), matrix[i, j], places=6)
+
+    def test_tfidf_embedders_share_the_stem_cache(self):
+        sentences = ["Running dogs were chasing cats.", "The cats kept running."]
+        TfidfEmbedder(self.nlp, sentences)
+        hits = stem.cache_info().hits
+        second = TfidfEmbedder(self.nlp, sentences)
+        self.assertGreaterEqual(stem.cache_info().hits - hits, 6)
+        self.assertEqual(second.preprocess_sentence(sentences[1]), second.sent2processed_sent[sentences[1]])
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+import spacy
+
+from summarization.utils import CachingEmbedder, Embedder, EmbeddingCache, SpacyEmbedder, TfidfEmbedder, \
+    Sentence, SentenceRecord
+
+class EmbeddingCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_path)
+        self.nlp = spacy.blank('en')
+
+        random = np.random.RandomState(0)
+        self.sentences = [Sentence("doc1", None, SentenceRecord("Sentence  {0}.".format(i), ("s",), vector, 1), i)
+                          for i, vector in enumerate(random.randn(5, 4).astype(np.float32))]
+        self.config = {
+            Embedder.CONFIG_EMBED_NAME_KEY: SpacyEmbedder.name,
+            Embedder.CACHE_CONFIG_KEY: True,
+            CachingEmbedder.CACHE_PATH_CONFIG_KEY: self.cache_path,
+        }
+
+    def test_cache_persists_embeddings(self):
+        cache = EmbeddingCache(self.cache_path, 2 ** 20, 0)
+        cache.put("a", np.arange(3))
+        cache.flush()
+
+        reopened = EmbeddingCache(self.cache_path, 2 ** 20, 0)
+        np.testing.assert_array_equal(np.arange(3, dtype=np.float32), reopened.get("a"))
+        self.assertIsNone(reopened.get("b"))
+
+    def test_cache_evicts_least_recently_used_embeddings(self):
+        # room for four embeddings of width 2
+        cache = EmbeddingCache(self.cache_path, 4 * 2 * 4, 0)
+        for i, key in enumerate("abcd"):
+            cache.put(key, [i, i])
+        cache.get("a")
+        cache.put("e", [4, 4])
+
+        self.assertEqual(4, len(cache))
+        self.assertIsNone(cache.get("b"))
+        for key in "acde":
+            self.assertIsNotNone(cache.get(key))
+
+    def test_embedder_from_config_wraps_cached_embedders(self):
+        embedder = Embedder.from_config(self.config, self.nlp, self.sentences)
+        self.assertIsInstance(embedder, CachingEmbedder)
+        self.assertIsInstance(embedder.embedder, SpacyEmbedder)
+
+        uncached = SpacyEmbedder(self.nlp)
+        np.testing.assert_allclose(uncached.similarity_matrix(self.sentences),
+                                   embedder.similarity_matrix(self.sentences), rtol=1e-6)
+
+    def test_cached_embeddings_are_keyed_by_normalized_text(self):
+        Embedder.from_config(self.config, self.nlp, self.sentences).embed_many(self.sentences)
+
+        same_text = Sentence("doc2", None, SentenceRecord("Sentence 3.", ("s",), np.zeros(4), 1), 0)
+        embedder = Embedder.from_config(self.config, self.nlp, [same_text])
+        with patch.object(SpacyEmbedder, "embed_many") as embed_many:
+            np.testing.assert_array_equal(self.sentences[3].vector, embedder.embed(same_text)[0])
+            embed_many.assert_not_called()
+
+    def test_sparse_embedders_are_not_cached(self):
+        raw_sentences = ["The cat sat on the mat.", "The dog sat on the log."]
+        config = dict(self.config, name=TfidfEmbedder.name)
+        embedder = Embedder.from_config(config, self.nlp, raw_sentences)
+        uncached = TfidfEmbedder(self.nlp, raw_sentences)
+
+        sentences = [Sentence("doc1", None, self.nlp(sentence), i) for i, sentence in enumerate(raw_sentences)]
+        np.testing.assert_allclose(uncached.similarity_matrix(sentences).toarray(),
+                                   embedder.similarity_matrix(sentences).toarray())
+        self.assertEqual(0, len(embedder.cache))
@@ -0,0 +1,69 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from corpus.gigaword import GigawordIndex
+
+GIGAWORD_FILE = b"""<DOC id="APW_ENG_20070101.0001" type="story" >
+<HEADLINE>
+First headline
+</HEADLINE>
+<TEXT>
+<P>
+First story.
+</P>
+</TEXT>
+</DOC>
+<DOC id="APW_ENG_20070101.0002" type="story" >
+<HEADLINE>
+Second headline
+</HEADLINE>
+<DATELINE>
+NEW YORK
+</DATELINE>
+<TEXT>
+<P>
+Second story.
+</P>
+</TEXT>
+</DOC>
+"""
+
+class GigawordIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.gw_path = tempfile.mkdtemp()
+        self.index_path = tempfile.mkdtemp()
+        self.path = os.path.join("data", "apw_eng", "apw_eng_200701.gz")
+        os.makedirs(os.path.join(self.gw_path, "data", "apw_eng"))
+        with gzip.open(os.path.join(self.gw_path, self.path), "wb") as outfile:
+            outfile.write(GIGAWORD_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.gw_path)
+        shutil.rmtree(self.index_path)
+
+    def test_offsets_indexes_every_document(self):
+        gw_index = GigawordIndex(self.gw_path, self.index_path)
+        offsets = gw_index.offsets(self.path)
+        self.assertEqual({"APW_ENG_20070101.0001", "APW_ENG_20070101.0002"}, set(offsets))
+        self.assertTrue(os.path.isfile(gw_index.index_file(self.path)))
+
+    def test_read_stories_reads_requested_documents(self):
+        gw_index = GigawordIndex(self.gw_path, self.index_path)
+        story, = gw_index.read_stories(self.path, {"APW_ENG_20070101.0002"})
+        self.assertEqual("APW_ENG_20070101.0002", story.doc_id)
+        self.assertEqual("Second headline", story.headline)
+        self.assertEqual("Second story.", ''.join(story.paragraphs).strip())
+
+    def test_read_stories_reuses_an_existing_index(self):
+        GigawordIndex(self.gw_path, self.index_path).offsets(self.path)
+        os.remove(os.path.join(self.gw_path, self.path))
+        stories = list(GigawordIndex(self.gw_path, self.index_path).read_stories(self.path, {"APW_ENG_20070101.0001"}))
+        self.assertEqual(["APW_ENG_20070101.0001"], [s.doc_id for s in stories])
+
+    def test_read_stories_skips_unknown_documents(self):
+        gw_index = GigawordIndex(self.gw_path, self.index_path)
+        self.assertEqual([], list(gw_index.read_stories(self.path, {"APW_ENG_20070101.0003"})))
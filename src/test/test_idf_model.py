@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import spacy
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from summarization.utils import Embedder, HashingTfidfEmbedder, IdfModel, Sentence
+from summarization.utils.idf_model import collection_texts, normalized_texts
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "examples", "AQUAINT")
+
+class IdfModelTestCase(TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir)
+        self.nlp = spacy.blank('en')
+
+        self.documents = ["The cat sat on the mat.", "The dog sat on the log.", "A cat and a dog met.",
+                          "Stocks fell sharply on Monday."]
+        self.model = IdfModel.fit(normalized_texts(self.nlp, self.documents), batch_size=3)
+
+    def test_weights_match_a_tfidf_vectorizer_fit_on_the_same_documents(self):
+        texts = list(normalized_texts(self.nlp, self.documents))
+        fit = TfidfVectorizer().fit_transform(texts)
+
+        self.assertEqual(len(self.documents), self.model.document_count)
+        hashed = self.model.transform(texts)
+        np.testing.assert_allclose((fit * fit.T).toarray(), (hashed * hashed.T).toarray())
+        np.testing.assert_allclose(sorted(fit.data), sorted(hashed.data))
+
+    def test_saved_model_loads(self):
+        path = os.path.join(self.model_dir, "idf.npz")
+        self.model.save(path)
+        loaded = IdfModel.open(path)
+        np.testing.assert_array_equal(self.model.idf, loaded.idf)
+        self.assertEqual(self.model.document_count, loaded.document_count)
+
+    def test_collection_texts_reads_every_aquaint_document(self):
+        texts = list(collection_texts(aquaint_path=EXAMPLES_PATH))
+        self.assertEqual(2483, len(texts))
+        self.assertTrue(all(isinstance(text, str) for text in texts))
+
+    def test_hashing_embedder_embeds_a_sentence_the_same_in_any_topic(self):
+        path = os.path.join(self.model_dir, "idf.npz")
+        self.model.save(path)
+        config = {
+            Embedder.CONFIG_EMBED_NAME_KEY: HashingTfidfEmbedder.name,
+            HashingTfidfEmbedder.IDF_MODEL_CONFIG_KEY: path,
+        }
+        sentences = [Sentence("doc1", None, self.nlp(text), i) for i, text in enumerate(self.documents)]
+
+        first = Embedder.from_config(config, self.nlp, sentences[:2])
+        second = Embedder.from_config(config, self.nlp, sentences[::-1])
+        self.assertIsInstance(first, HashingTfidfEmbedder)
+        np.testing.assert_allclose(first.embed_many(sentences[:2]).toarray(),
+                                   second.embed_many(sentences[:2]).toarray())
+        self.assertAlmostEqual(second.similarity_matrix(sentences[:2])[0, 1],
+                               first.cosine_similarity(sentences[0], sentences[1]))
+
+    def test_hashing_embedder_requires_a_model(self):
+        with self.assertRaises(ValueError):
+            Embedder.from_config({Embedder.CONFIG_EMBED_NAME_KEY: HashingTfidfEmbedder.name}, self.nlp, [])
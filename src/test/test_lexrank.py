@@ -0,0 +1,123 @@
+from unittest import TestCase
+
+import numpy as np
+import spacy
+
+from corpus.story import Story
+from summarization.strategy.lexrank import LexRankSummarizer, TopKStable
+from summarization.utils import Embedder, SpacyEmbedder, Sentence, SentenceRecord
+
+class LexRankTestCase(TestCase):
+
+    def setUp(self):
+        self.nlp = spacy.blank('en')
+        self.embedder_config = {
+            Embedder.CONFIG_EMBED_NAME_KEY: SpacyEmbedder.name
+        }
+
+        random = np.random.RandomState(573)
+        self.sentences = [Sentence("doc1", None, SentenceRecord("s", ("s",), vector, 1), i)
+                          for i, vector in enumerate(random.randn(23, 8))]
+        self.embedder = SpacyEmbedder(self.nlp)
+
+    def lexrank(self, sparse):
+        return LexRankSummarizer(None, self.embedder_config, 0.1, 0.001, self.nlp, sparse=sparse, block_size=5)
+
+    def test_sparse_matrix_matches_dense_matrix(self):
+        dense = self.lexrank(False)._create_matrix(self.embedder, self.sentences, 0.1)
+        sparse = self.lexrank(True)._create_matrix(self.embedder, self.sentences, 0.1)
+        np.testing.assert_allclose(dense, sparse.toarray())
+
+    def test_power_method_on_sparse_matrix_matches_dense_matrix(self):
+        dense = self.lexrank(False)._create_matrix(self.embedder, self.sentences, 0.1)
+        sparse = self.lexrank(True)._create_matrix(self.embedder, self.sentences, 0.1)
+        np.testing.assert_allclose(LexRankSummarizer.power_method(dense, 0.001),
+                                   LexRankSummarizer.power_method(sparse, 0.001))
+
+    def test_sparse_selection_matches_dense_selection(self):
+        selections = []
+        for sparse in (False, True):
+            lexrank = self.lexrank(sparse)
+            ranked = lexrank.summarize([Story(None, self.sentences)])
+            selections.append(lexrank.select_sentences(ranked, 8, 0.5))
+        self.assertEqual(selections[0], selections[1])
+
+    def test_selection_skips_sentences_redundant_with_chosen_ones(self):
+        lexrank = self.lexrank(False)
+        ranked = lexrank.summarize([Story(None, self.sentences)])
+        chosen = lexrank.select_sentences(ranked, 8, 0.5)
+
+        self.assertEqual(ranked[0], chosen[0])
+        self.assertLessEqual(len(chosen), 8)
+        similarities = self.embedder.similarity_matrix(chosen)
+        self.assertTrue(np.all(similarities[np.triu_indices(len(chosen), k=1)] < 0.5))
+        # every sentence that was passed over is redundant with a sentence chosen before it
+        for sentence in ranked[:ranked.index(chosen[-1])]:
+            if sentence not in chosen:
+                better = [c for c in chosen if ranked.index(c) < ranked.index(sentence)]
+                self.assertGreaterEqual(self.embedder.similarity_matrix([sentence], better).max(), 0.5)
+
+    def test_selection_stops_once_the_word_limit_is_full(self):
+        lexrank = self.lexrank(False)
+        ranked = lexrank.summarize([Story(None, self.sentences)])
+        self.assertEqual(3, len(lexrank.select_sentences(ranked, 3, 1.0)))
+
+    def test_power_method_stops_at_max_iterations(self):
+        # a walk on a two-cycle started from one end oscillates forever
+        matrix = np.array([[0.0, 1.0], [1.0, 0.0]])
+        scores = LexRankSummarizer.power_method(matrix, 0.001, max_iterations=10, start=[1.0, 0.0])
+        np.testing.assert_allclose([1.0, 0.0], scores)
+
+    def test_damped_power_method_spreads_sink_mass(self):
+        matrix = np.array([[0.0, 1.0, 0.0], [0.5, 0.0, 0.5], [0.0, 0.0, 0.0]])
+        scores = LexRankSummarizer.power_method(matrix, 1e-9, damping=0.85, max_iterations=1000)
+        self.assertAlmostEqual(1.0, scores.sum())
+        self.assertTrue(np.all(scores > 0))
+
+    def test_power_method_converges_immediately_from_a_warm_start(self):
+        matrix = self.lexrank(False)._create_matrix(self.embedder, self.sentences, 0.1)
+        scores = LexRankSummarizer.power_method(matrix, 1e-9)
+
+        iterations = []
+        warm = LexRankSummarizer.power_method(matrix, 1e-6, start=scores, stop=lambda p: iterations.append(p) and False)
+        self.assertEqual(1, len(iterations))
+        np.testing.assert_allclose(scores, warm)
+
+    def test_top_k_stable_stops_early_with_the_same_top_sentences(self):
+        matrix = self.lexrank(False)._create_matrix(self.embedder, self.sentences, 0.1)
+        word_counts = [len(sentence) for sentence in self.sentences]
+
+        all_iterations = []
+        converged = LexRankSummarizer.power_method(matrix, 1e-12, stop=lambda p: all_iterations.append(p) and False)
+        iterations = []
+        stop = TopKStable(word_counts, 5)
+        early = LexRankSummarizer.power_method(matrix, 1e-12, stop=lambda p: iterations.append(p) or stop(p))
+
+        self.assertLess(len(iterations), len(all_iterations))
+        self.assertEqual(list(np.argsort(-converged, kind="stable")[:6]), list(np.argsort(-early, kind="stable")[:6]))
+
+    def test_update_matches_ranking_every_sentence_at_once(self):
+        stories = [Story(None, self.sentences[:15]), Story(None, self.sentences[15:])]
+        for sparse in (False, True):
+            full = self.lexrank(sparse)
+            full.summarize(stories)
+            full_scores = dict(zip(self.sentences, full.rank(full._create_matrix(self.embedder, self.sentences, 0.1),
+                                                             self.sentences)))
+
+            incremental = self.lexrank(sparse)
+            incremental.summarize(stories[:1])
+            ranked = incremental.update(stories[1:])
+
+            self.assertEqual(set(self.sentences[15:]), set(ranked))
+            self.assertEqual(sorted(self.sentences[15:], key=lambda s: -full_scores[s]), list(ranked))
+
+    def test_update_selection_avoids_sentences_redundant_with_the_first_summary(self):
+        lexrank = self.lexrank(False)
+        first_summary = lexrank.select_sentences(lexrank.summarize([Story(None, self.sentences[:15])]), 4, 0.5)
+        ranked = lexrank.update([Story(None, self.sentences[15:])])
+        update_summary = lexrank.select_sentences(ranked, 4, 0.5, first_summary)
+
+        self.assertTrue(update_summary)
+        self.assertTrue(set(update_summary) <= set(self.sentences[15:]))
+        similarities = self.embedder.similarity_matrix(update_summary, first_summary)
+        self.assertTrue(np.all(similarities < 0.5))
@@ -0,0 +1,69 @@
+import os
+from unittest import TestCase
+
+import numpy as np
+
+from corpus import Corpus, load_pipeline
+from summarization.strategy.lexrank import LexRankSummarizer
+from summarization.strategy.lsh import HyperplaneLSH
+from summarization.utils import Embedder, TfidfEmbedder
+
+ROOT_PATH = os.path.join(os.path.dirname(__file__), "..", "..")
+
+class HyperplaneLSHTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nlp = load_pipeline("blank:en")
+        config = {
+            'clusterPath': os.path.join(ROOT_PATH, "conf", "test_topics.xml"),
+            'documentCollections': {
+                'aquaint': os.path.join(ROOT_PATH, "examples", "AQUAINT"),
+            },
+        }
+        cls.corpus = Corpus.from_config(config, cls.nlp)
+        cls.embedder_config = {
+            Embedder.CONFIG_EMBED_NAME_KEY: TfidfEmbedder.name
+        }
+
+    def rank(self, topic, lsh):
+        sentences = [sentence for story in topic.stories for sentence in story.sentences]
+        embedder = Embedder.from_config(self.embedder_config, self.nlp, sentences)
+        lexrank = LexRankSummarizer(None, self.embedder_config, 0.1, 0.001, self.nlp, lsh=lsh)
+        matrix = lexrank._create_matrix(embedder, sentences, 0.1)
+        return matrix, LexRankSummarizer.power_method(matrix, 1e-6)
+
+    @staticmethod
+    def top(scores, k):
+        return list(np.argsort(-scores, kind="stable")[:k])
+
+    def test_lsh_rankings_match_exact_rankings_on_sample_topics(self):
+        for topic in self.corpus.topics:
+            exact_matrix, exact_scores = self.rank(topic, None)
+            lsh_matrix, lsh_scores = self.rank(topic, HyperplaneLSH())
+
+            # the approximate graph only ever misses edges
+            self.assertEqual(0, ((lsh_matrix > 0).toarray() & ~(exact_matrix > 0)).sum())
+            self.assertEqual(self.top(exact_scores, 4), self.top(lsh_scores, 4))
+            self.assertGreaterEqual(len(set(self.top(exact_scores, 10)) & set(self.top(lsh_scores, 10))), 8)
+
+    def test_lsh_with_more_tables_recovers_the_exact_top_sentences(self):
+        for topic in self.corpus.topics:
+            _, exact_scores = self.rank(topic, None)
+            _, lsh_scores = self.rank(topic, HyperplaneLSH(tables=64))
+            self.assertEqual(set(self.top(exact_scores, 10)), set(self.top(lsh_scores, 10)))
+
+    def test_more_tables_find_more_candidate_pairs(self):
+        topic, = self.corpus.topics
+        sentences = [sentence for story in topic.stories for sentence in story.sentences]
+        embeddings = Embedder.from_config(self.embedder_config, self.nlp, sentences).embed_many(sentences)
+
+        pairs = [set(zip(*HyperplaneLSH(tables=tables).candidate_pairs(embeddings))) for tables in (4, 8, 16)]
+        self.assertTrue(pairs[0] < pairs[1] < pairs[2])
+
+    def test_pair_similarities_match_cosine_similarity(self):
+        embeddings = np.random.RandomState(0).randn(6, 4)
+        rows, columns = np.array([0, 1, 2]), np.array([3, 4, 5])
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1)[:, np.newaxis]
+        np.testing.assert_allclose(np.sum(normalized[rows] * normalized[columns], axis=1),
+                                   HyperplaneLSH.pair_similarities(embeddings, rows, columns))
@@ -0,0 +1,119 @@
+import os
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+
+from corpus.readers import read_aquaint_stories, read_aquaint2_stories
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "examples", "AQUAINT")
+
+AQUAINT_FILE = """<DOC>
+<DOCNO> XIE19990504.0020 </DOCNO>
+<DATE_TIME> 05/04/1999 08:12:00 </DATE_TIME>
+<BODY>
+<HEADLINE> A headline &AMP; more </HEADLINE>
+<TEXT>
+<P>
+A story.
+</P>
+</TEXT>
+</BODY>
+</DOC>
+<DOC>
+<DOCNO> XIE19990504.0021 </DOCNO>
+<BODY>
+<TEXT>
+Another story.
+</TEXT>
+</BODY>
+</DOC>
+"""
+
+AQUAINT2_FILE = """<DOCSTREAM>
+<DOC id="APW_ENG_20041001.0001" type="story" >
+<HEADLINE>
+First headline
+</HEADLINE>
+<TEXT>
+<P>
+First story.
+</P>
+</TEXT>
+</DOC>
+<DOC id="APW_ENG_20041001.0002" type="story" >
+<HEADLINE>
+Second headline
+</HEADLINE>
+<TEXT>
+<P>
+Second story, first paragraph.
+</P>
+<P>
+Second story, second paragraph.
+</P>
+</TEXT>
+</DOC>
+<DOC id="APW_ENG_20041001.0003" type="story" >
+<TEXT>
+<P>
+Third story &amp; no headline.
+</P>
+</TEXT>
+</DOC>
+</DOCSTREAM>
+"""
+
+class ReadersTestCase(TestCase):
+
+    def setUp(self):
+        fd, self.aquaint2_path = tempfile.mkstemp(suffix=".xml")
+        with os.fdopen(fd, "w") as outfile:
+            outfile.write(AQUAINT2_FILE)
+
+        fd, self.aquaint_path = tempfile.mkstemp()
+        with os.fdopen(fd, "w") as outfile:
+            outfile.write(AQUAINT_FILE)
+
+    def tearDown(self):
+        os.remove(self.aquaint2_path)
+        os.remove(self.aquaint_path)
+
+    def test_read_aquaint2_stories_only_yields_requested_documents(self):
+        doc_ids = {"APW_ENG_20041001.0002", "APW_ENG_20041001.0003"}
+        stories = list(read_aquaint2_stories(self.aquaint2_path, doc_ids))
+        self.assertEqual(["APW_ENG_20041001.0002", "APW_ENG_20041001.0003"], [s.doc_id for s in stories])
+
+    def test_read_aquaint2_stories_extracts_headline_and_text(self):
+        story, = read_aquaint2_stories(self.aquaint2_path, {"APW_ENG_20041001.0002"})
+        self.assertEqual("Second headline", story.headline)
+        self.assertIsNone(story.timestamp)
+        body = ' '.join(' '.join(p.split()) for p in story.paragraphs if p.strip())
+        self.assertEqual("Second story, first paragraph. Second story, second paragraph.", body)
+
+    def test_read_aquaint2_stories_handles_missing_headline(self):
+        story, = read_aquaint2_stories(self.aquaint2_path, {"APW_ENG_20041001.0003"})
+        self.assertIsNone(story.headline)
+        self.assertIn("Third story & no headline.", ''.join(story.paragraphs))
+
+    def test_read_aquaint2_stories_ignores_unknown_ids(self):
+        self.assertEqual([], list(read_aquaint2_stories(self.aquaint2_path, {"APW_ENG_20041001.9999"})))
+
+    def test_read_aquaint_stories_reads_sample_documents_in_file_order(self):
+        path = os.path.join(EXAMPLES_PATH, "apw", "1999", "19990425_APW_ENG")
+        stories = list(read_aquaint_stories(path, {"APW19990425.0114", "APW19990425.0023"}))
+        self.assertEqual(["APW19990425.0023", "APW19990425.0114"], [s.doc_id for s in stories])
+        self.assertEqual(datetime(1999, 4, 25), stories[0].timestamp)
+        self.assertTrue(stories[0].headline)
+        self.assertTrue(''.join(stories[0].paragraphs).strip())
+
+    def test_read_aquaint_stories_parses_slash_dates(self):
+        story, = read_aquaint_stories(self.aquaint_path, {"XIE19990504.0020"})
+        self.assertEqual(datetime(1999, 5, 4), story.timestamp)
+        self.assertEqual("A headline & more", story.headline)
+        self.assertEqual("A story.", ''.join(story.paragraphs).strip())
+
+    def test_read_aquaint_stories_handles_missing_date_and_headline(self):
+        story, = read_aquaint_stories(self.aquaint_path, {"XIE19990504.0021"})
+        self.assertIsNone(story.timestamp)
+        self.assertIsNone(story.headline)
+        self.assertEqual("Another story.", ''.join(story.paragraphs).strip())
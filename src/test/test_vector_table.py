@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import spacy
+
+from summarization.utils import Embedder, SpacyEmbedder, Sentence, SentenceRecord, VectorTable
+
+class VectorTableTestCase(TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.table_path)
+
+        self.nlp = spacy.blank('en')
+        random = np.random.RandomState(573)
+        for word in ("the", "cat", "sat", "on", "mat", "."):
+            self.nlp.vocab.set_vector(word, random.randn(6).astype(np.float32))
+        VectorTable.build(self.nlp, self.table_path)
+
+        self.docs = [self.nlp(text) for text in ("the cat sat on the mat .", "the dog sat .", "unknown words")]
+
+    def test_table_is_memory_mapped(self):
+        table = VectorTable(self.table_path)
+        self.assertIsInstance(table.vectors, np.memmap)
+        self.assertEqual(6, table.width)
+
+    def test_sentence_vectors_match_spacy(self):
+        table = VectorTable(self.table_path)
+        for doc in self.docs:
+            np.testing.assert_allclose(doc.vector, table.sentence_vector(token.text for token in doc), rtol=1e-6)
+
+    def test_spacy_embedder_reads_the_table(self):
+        config = {
+            Embedder.CONFIG_EMBED_NAME_KEY: SpacyEmbedder.name,
+            SpacyEmbedder.VECTOR_TABLE_CONFIG_KEY: self.table_path,
+        }
+        embedder = Embedder.from_config(config, self.nlp, [])
+        # the sentences carry no vectors of their own, so the embeddings can only come from the table
+        sentences = [Sentence("doc1", None, SentenceRecord(doc.text, tuple(token.text for token in doc), np.zeros(0),
+                                                           len(doc)), i)
+                     for i, doc in enumerate(self.docs)]
+
+        np.testing.assert_allclose(np.vstack([doc.vector for doc in self.docs]), embedder.embed_many(sentences),
+                                   rtol=1e-6)
+        np.testing.assert_allclose(embedder.similarity_matrix(sentences[:2]),
+                                   np.vstack([block for _, block in embedder.similarity_blocks(sentences[:2], 1)]),
+                                   rtol=1e-6)